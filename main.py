@@ -1,7 +1,7 @@
 import argparse
 from pipeline_lib.logging_config import setup_logging
-from pipeline_lib.rawdata_fetch import generate_rawdata_snapshot, compare_rawdata_snapshots
-from pipeline_lib.transform_rawdata import transform_enqueued_items
+from pipeline_lib.rawdata_fetch import generate_rawdata_snapshot, compare_rawdata_snapshots, rebuild_probe_cache
+from pipeline_lib.transform_rawdata import transform_enqueued_items, transformation_queue
 from pipeline_lib.olap_sync import olap_sync
 from pipeline_lib.powerbi import powerbi_refresh
 from pipeline_lib.cqr import cqr
@@ -21,6 +21,8 @@ def main():
     group.add_argument('--olap', action='store_true', help='Only sync OLAP reports')
     group.add_argument('--pbi', action='store_true', help='Only refresh Power BI dataset')
     group.add_argument('--cqr', action='store_true', help='Only run the CQR process')
+    group.add_argument('--export-queue', action='store_true', help='Export the transformation queue to CSV')
+    group.add_argument('--rebuild-probe-cache', action='store_true', help='Clear and rebuild the rawdata file probe cache')
 
     parser.add_argument(
         '--week',
@@ -28,6 +30,12 @@ def main():
         help='Target week for CQR (e.g. 2025-01-16)'
     )
 
+    parser.add_argument(
+        '--workers',
+        type=int,
+        help='Number of parallel workers (snapshot scan, probe cache rebuild, transform, OLAP sync)'
+    )
+
     args = parser.parse_args()
 
     if args.week and not args.cqr:
@@ -36,24 +44,28 @@ def main():
     print("QUALITY PIPELINE - Iteration Started")
 
     if args.auto:
-        generate_rawdata_snapshot()
+        generate_rawdata_snapshot(workers=args.workers)
         compare_rawdata_snapshots()
-        transform_enqueued_items()
-        success_count = olap_sync()
+        transform_enqueued_items(workers=args.workers)
+        success_count = olap_sync(workers=args.workers)
         powerbi_refresh() if success_count > 0 else print("Power BI refresh skipped due to no OLAP updates.")
         cqr() if success_count > 0 else print("CQR process skipped due to no OLAP updates.")
     elif args.snapshot:
-        generate_rawdata_snapshot()
+        generate_rawdata_snapshot(workers=args.workers)
     elif args.enqueue:
         compare_rawdata_snapshots()
     elif args.transform:
-        transform_enqueued_items()
+        transform_enqueued_items(workers=args.workers)
     elif args.olap:
-        olap_sync()
+        olap_sync(workers=args.workers)
     elif args.pbi:
         powerbi_refresh()
     elif args.cqr:
         cqr(week=args.week) 
+    elif args.export_queue:
+        transformation_queue.export_csv()
+    elif args.rebuild_probe_cache:
+        rebuild_probe_cache(workers=args.workers)
 
     print("QUALITY PIPELINE - Iteration Ended")
 
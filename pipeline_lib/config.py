@@ -42,7 +42,13 @@ PIPELINE_ROOT_PATH
     ...
     ├── <projectid-n>_<project-name-n>
     ├── project_masterfile.xlsx (*)
-    └── snapshot_rawdata_folders.csv (*)
+    ├── probe_cache.db (*)
+    ├── stat_tree.db (*)
+    ├── olap_manifest.db (*)
+    └── snapshot_rawdata_folders (*)
+        ├── manifest.json
+        └── snapshot_id=<n>
+            └── part-0.parquet
 """
 
 DATA_PROCESS_DIR = "Data_Process"
@@ -70,9 +76,31 @@ PROJECT_INFO_FILE_PATH = os.path.join(PIPELINE_ROOT_PATH, OLAP_DIR, PROJECT_INFO
 SNAPSHOT_FILE = "snapshot_rawdata_folders.csv"
 SNAPSHOT_FILE_PATH = os.path.join(PIPELINE_ROOT_PATH, OLAP_DIR, SNAPSHOT_FILE)
 
+SNAPSHOT_STORE_DIR = "snapshot_rawdata_folders"
+SNAPSHOT_STORE_DIR_PATH = os.path.join(PIPELINE_ROOT_PATH, OLAP_DIR, SNAPSHOT_STORE_DIR)
+
 QUEUE_TRANSFORMATION_FILE = "transformation_queue.csv"
 QUEUE_TRANSFORMATION_FILE_PATH = os.path.join(PIPELINE_ROOT_PATH, DATA_PROCESS_DIR, QUEUE_TRANSFORMATION_FILE)
 
+PROBE_CACHE_FILE = "probe_cache.db"
+PROBE_CACHE_FILE_PATH = os.path.join(PIPELINE_ROOT_PATH, OLAP_DIR, PROBE_CACHE_FILE)
+PROBE_CACHE_MAX_ENTRIES = int(os.getenv("PROBE_CACHE_MAX_ENTRIES", "200000"))
+PROBE_CACHE_MAX_AGE_DAYS = int(os.getenv("PROBE_CACHE_MAX_AGE_DAYS", "180"))
+
+STAT_TREE_FILE = "stat_tree.db"
+STAT_TREE_FILE_PATH = os.path.join(PIPELINE_ROOT_PATH, OLAP_DIR, STAT_TREE_FILE)
+STAT_TREE_FULL_RESCAN_HOURS = float(os.getenv("STAT_TREE_FULL_RESCAN_HOURS", "24"))
+
+OLAP_MANIFEST_FILE = "olap_manifest.db"
+OLAP_MANIFEST_FILE_PATH = os.path.join(PIPELINE_ROOT_PATH, OLAP_DIR, OLAP_MANIFEST_FILE)
+OLAP_INCREMENTAL = os.getenv("OLAP_INCREMENTAL", "true").lower() == "true" # skip report sets whose input Parquet files are unchanged
+
+OLAP_EXPORT_FORMATS = [f.strip().lower() for f in os.getenv("OLAP_EXPORT_FORMATS", "csv").split(",") if f.strip()] # csv, parquet (or both: "csv,parquet")
+
+QUEUE_TRANSFORMATION_DB = "transformation_queue.db"
+QUEUE_TRANSFORMATION_DB_PATH = os.path.join(PIPELINE_ROOT_PATH, DATA_PROCESS_DIR, QUEUE_TRANSFORMATION_DB)
+QUEUE_LEASE_SECONDS = int(os.getenv("QUEUE_LEASE_SECONDS", "600")) # claimed items are reclaimable once the lease expires
+
 
 # PowerBI Refresh Webhook
 PBI_REFRESH_WEBHOOK = os.getenv("PBI_REFRESH_WEBHOOK_URL")
@@ -100,6 +128,11 @@ DATASET_HEADER = {
 }
 
 
+# Default number of threads scanning rawdata week folders (overridden by --workers): serial scan unless asked for
+SCAN_WORKERS = int(os.getenv("SCAN_WORKERS", "1"))
+TRANSFORM_ITEM_TIMEOUT = int(os.getenv("TRANSFORM_ITEM_TIMEOUT", "1800")) # seconds, per item with --transform --workers
+
+
 # Default Start Date for Data Processing (won't process data before this date)
 START_DATE_DEFAULT = "2025-07-01"
 
@@ -123,4 +156,36 @@ UQ_V2_SCHEMA = [
     "confusion_type",
     "weight",
     "rubric_credit"
-]
\ No newline at end of file
+]
+
+
+# Parquet schema enforced on transformed outputs (legacy and UQv2), before writing.
+# Types are fixed per column, not inferred from the data: DuckDB reads a week folder
+# using the schema of the first file it opens.
+# job_id is left out on purpose: near-unique values make the Arrow dictionary larger than
+# the plain encoding Parquet falls back to.
+PARQUET_DICTIONARY_COLUMNS = [
+    "project_id",
+    "workflow",
+    "rater_id",
+    "auditor_id",
+    "parent_label",
+    "label",
+    "rubric",
+    "confusion_type",
+    "rater_response",
+    "auditor_response",
+    "methodology"
+]
+PARQUET_DATE_COLUMNS = ["job_date", "content_week", "reporting_week"]
+# Numeric casts must be lossless: weight stays float64, as float32 would change the weighted
+# sums of the reports for non-dyadic weights (ten 0.1 weights no longer add up to 1.0)
+PARQUET_NUMERIC_TYPES = {
+    "weight": "float64",    # label weights (module config values)
+    "factor": "int16"       # rubric factors
+}
+
+# Parquet writer settings for transformed outputs
+PARQUET_ROW_GROUP_SIZE = int(os.getenv("PARQUET_ROW_GROUP_SIZE", "262144")) # rows per row group
+PARQUET_COMPRESSION = os.getenv("PARQUET_COMPRESSION", "zstd") # zstd, snappy, gzip, brotli, lz4, none
+PARQUET_COMPRESSION_LEVEL = int(os.getenv("PARQUET_COMPRESSION_LEVEL")) if os.getenv("PARQUET_COMPRESSION_LEVEL") else None
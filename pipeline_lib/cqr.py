@@ -72,19 +72,22 @@ def cqr(week: str = None):
 
         # Get rater export file (file ending with _smr-rater-label.csv)
         rater_export_file_path = os.path.join(project_folder, f"{project_id}_{previous_weekending_str}_{project_base}_smr-rater-label.csv")
-        if not os.path.exists(rater_export_file_path):
+        if not pu.olap_report_exists(rater_export_file_path):
             logger.warning(f"Rater export file not found for project {project_id} at {rater_export_file_path}. Skipping.")
             continue
 
-        # Load rater export file
+        # Load rater export file (Parquet copy preferred)
         try:
-            rater_export_df = pd.read_csv(rater_export_file_path)
+            rater_export_df = pu.read_olap_report(rater_export_file_path)
         except Exception as e:
             skipped_count += 1
             logger.error(f"Error loading rater export file for project {project_id} at {rater_export_file_path}: {e}. Skipping.")
             continue
 
 
+        # Same week_ending text whether the report came from Parquet (date) or CSV (string)
+        rater_export_df["week_ending"] = pd.to_datetime(rater_export_df["week_ending"], errors="coerce").dt.strftime("%Y-%m-%d")
+
         # Append ' to rater_id to preserve leading zeros in Excel
         rater_export_df["rater_id"] = (
             rater_export_df["rater_id"]
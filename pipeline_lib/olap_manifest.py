@@ -0,0 +1,206 @@
+import os
+import glob
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# --- Logger
+import logging
+logger = logging.getLogger(__name__)
+
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file_content(file_path):
+    hasher = hashlib.md5()
+    with open(file_path, 'rb') as f:
+        while chunk := f.read(HASH_CHUNK_SIZE):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+# Persistent manifest of the OLAP report sets generated so far, one entry per
+# (project_id, reporting_week, base): input Parquet files (name, size, content hash),
+# fingerprint of the report settings (target, SQL templates) and the report files written.
+# A report set whose inputs and settings did not change, and whose reports are still on
+# disk, is not generated again.
+class OlapManifest:
+    def __init__(self, filepath, max_age_days=365):
+        self.filepath = filepath
+        self.max_age_days = max_age_days
+        self.columns = [
+            'project_id',
+            'reporting_week',
+            'base',
+            'inputs',
+            'fingerprint',
+            'reports',
+            'generated_at',
+            'last_seen'
+        ]
+        self._lock = threading.Lock()
+        self._entries = None
+        self._dirty = set()
+        self.skipped = 0
+        self.generated = 0
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.filepath, timeout=30)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def _init_db(self, conn):
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS olap_manifest (
+                project_id      TEXT NOT NULL,
+                reporting_week  TEXT NOT NULL,
+                base            TEXT NOT NULL,
+                inputs          TEXT NOT NULL,
+                fingerprint     TEXT NOT NULL,
+                reports         TEXT NOT NULL,
+                generated_at    REAL NOT NULL,
+                last_seen       REAL NOT NULL,
+                PRIMARY KEY (project_id, reporting_week, base)
+            )
+        """)
+
+    def load(self):
+        with self._lock:
+            self._load()
+
+    def _load(self):
+        folder = os.path.dirname(self.filepath)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        with self._connect() as conn:
+            self._init_db(conn)
+            rows = conn.execute(f"SELECT {', '.join(self.columns)} FROM olap_manifest").fetchall()
+
+        self._entries = {}
+        for row in rows:
+            entry = dict(zip(self.columns, row))
+            entry["inputs"] = json.loads(entry["inputs"])
+            entry["reports"] = json.loads(entry["reports"])
+            self._entries[(entry["project_id"], entry["reporting_week"], entry["base"])] = entry
+        self._dirty = set()
+        self.skipped = 0
+        self.generated = 0
+        logger.debug(f"OLAP manifest loaded: {len(self._entries)} report sets")
+
+    def _get_entry(self, key):
+        with self._lock:
+            if self._entries is None:
+                self._load()
+            return self._entries.get(key)
+
+    # {filename: {"size", "mtime_ns", "md5"}} of the files matching input_pattern.
+    # Content hashes recorded for the same report set are reused while size and mtime match.
+    def input_state(self, key, input_pattern):
+        entry = self._get_entry(key)
+        known = entry["inputs"] if entry else {}
+
+        inputs = {}
+        for file_path in sorted(glob.glob(input_pattern)):
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                continue
+            name = os.path.basename(file_path)
+            previous = known.get(name)
+            if previous and previous["size"] == stat.st_size and previous["mtime_ns"] == stat.st_mtime_ns:
+                md5 = previous["md5"]
+            else:
+                md5 = hash_file_content(file_path)
+            inputs[name] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "md5": md5}
+        return inputs
+
+    def is_current(self, key, inputs, fingerprint):
+        entry = self._get_entry(key)
+        if entry is None or entry["fingerprint"] != fingerprint:
+            return False
+
+        # Same files with the same content: a rewrite with identical bytes only changes mtime
+        content = lambda files: {name: (f["size"], f["md5"]) for name, f in files.items()}
+        if content(entry["inputs"]) != content(inputs):
+            return False
+
+        if not all(os.path.exists(report_path) for report_path in entry["reports"]):
+            return False
+
+        with self._lock:
+            entry["inputs"] = inputs   # keeps the new mtimes, no re-hashing next time
+            entry["last_seen"] = time.time()
+            self._dirty.add(key)
+            self.skipped += 1
+        return True
+
+    def record(self, key, inputs, fingerprint, reports):
+        now = time.time()
+        with self._lock:
+            if self._entries is None:
+                self._load()
+            self._entries[key] = {
+                "project_id": key[0],
+                "reporting_week": key[1],
+                "base": key[2],
+                "inputs": inputs,
+                "fingerprint": fingerprint,
+                "reports": list(reports),
+                "generated_at": now,
+                "last_seen": now
+            }
+            self._dirty.add(key)
+            self.generated += 1
+
+    # Report sets of a project (or of one of its weeks) are generated again on the next OLAP sync
+    def forget(self, project_id, reporting_week=None):
+        condition = "project_id = ?" + (" AND reporting_week = ?" if reporting_week else "")
+        params = (project_id, reporting_week) if reporting_week else (project_id,)
+
+        with self._lock:
+            with self._connect() as conn, conn:
+                self._init_db(conn)
+                removed = conn.execute(f"DELETE FROM olap_manifest WHERE {condition}", params).rowcount
+            if self._entries is not None:
+                for key in [k for k in self._entries if k[0] == project_id and (reporting_week is None or k[1] == reporting_week)]:
+                    del self._entries[key]
+                    self._dirty.discard(key)
+
+        logger.info(f"OLAP manifest: {removed} report sets of {project_id} forgotten")
+        return removed
+
+    def save(self):
+        with self._lock:
+            if self._entries is None:
+                return
+
+            records = [self._entries[key] for key in self._dirty if key in self._entries]
+            cutoff = time.time() - self.max_age_days * 86400
+
+            with self._connect() as conn, conn:
+                self._init_db(conn)
+                conn.executemany(
+                    f"INSERT OR REPLACE INTO olap_manifest ({', '.join(self.columns)}) VALUES ({', '.join('?' for _ in self.columns)})",
+                    [
+                        (e["project_id"], e["reporting_week"], e["base"], json.dumps(e["inputs"]), e["fingerprint"], json.dumps(e["reports"]), e["generated_at"], e["last_seen"])
+                        for e in records
+                    ]
+                )
+                evicted = conn.execute("DELETE FROM olap_manifest WHERE last_seen < ?", (cutoff,)).rowcount
+
+            self._dirty = set()
+            if evicted:
+                self._entries = None
+
+        logger.info(f"OLAP manifest saved: {len(records)} report sets written, {evicted} evicted (skipped={self.skipped}, generated={self.generated})")
+        self.skipped = 0
+        self.generated = 0
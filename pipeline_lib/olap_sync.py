@@ -1,17 +1,24 @@
 import os
+import json
+import hashlib
+import threading
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import pipeline_lib.config as cfg
 import pipeline_lib.pipeline_utils as pu
 from pipeline_lib.queues import TransformationQueueManager
-from pipeline_lib.sql.queryrun import olap_query_run
+from pipeline_lib.sql.olap_engine import OlapEngine, week_parquet_pattern
+from pipeline_lib.sql.query_registry import QUERY_TEMPLATES, query_file_name
+from pipeline_lib.olap_manifest import OlapManifest
 from pipeline_lib.baits_exception import overwrite_olap
 
 OLAP_BASE_FOLDER = cfg.OLAP_EXPORT_DIR_PATH
 
 # --- Setup queues
-TRANSFORMATION_QUEUE_FILE = cfg.QUEUE_TRANSFORMATION_FILE_PATH
-transformation_queue = TransformationQueueManager(TRANSFORMATION_QUEUE_FILE)
+TRANSFORMATION_QUEUE_FILE = cfg.QUEUE_TRANSFORMATION_DB_PATH
+TRANSFORMATION_QUEUE_CSV_FILE = cfg.QUEUE_TRANSFORMATION_FILE_PATH
+transformation_queue = TransformationQueueManager(TRANSFORMATION_QUEUE_FILE, legacy_csv_path=TRANSFORMATION_QUEUE_CSV_FILE, lease_seconds=cfg.QUEUE_LEASE_SECONDS)
 
 # --- Logger
 import logging
@@ -21,70 +28,263 @@ logger = logging.getLogger(__name__)
 PROJECT_MASTERFILE = cfg.PROJECT_INFO_FILE_PATH
 project_list_df = pu.load_project_info(PROJECT_MASTERFILE, active_only=False)
 
+# --- Manifest of generated report sets (incremental OLAP)
+olap_manifest = OlapManifest(cfg.OLAP_MANIFEST_FILE_PATH)
 
+OLAP_REPORTS = ["smr-workflow", "smr-rater-label", "smr-job-label", "smr-rubric-analysis", "smr-error-contribution", "dmp-job-incorrect"]
 
-#### Generate csv reports
+# generate_olap_reports outcome for a report set skipped by the manifest: the items are synced,
+# but no report was written (no Power BI refresh / CQR needed for them)
+OLAP_UNCHANGED = "unchanged"
+
+# Projects whose smr reports are overwritten from raw files (baits_exception): always regenerated
+CBV2_PROJECT_ID = "a01Hs00001ocUa0IAE"
+EB_PROJECT_ID = "a01Hs00001ocUZgIAM"
+
+
+
+#### Generate csv / parquet reports
+
+def report_queries(project_base):
+    return [q for q in OLAP_REPORTS if q != "smr-rubric-analysis" or project_base == "halo"]
+
+
+# Settings a report set depends on besides its input files
+def report_fingerprint(project_base, target):
+    templates = {}
+    for query_name in report_queries(project_base):
+        query_file = query_file_name(query_name, project_base)
+        templates[query_file] = hashlib.md5(QUERY_TEMPLATES.get(query_file, "").encode('utf-8')).hexdigest()
+    settings = {"base": project_base, "target": target, "templates": templates, "formats": cfg.OLAP_EXPORT_FORMATS}
+    return hashlib.md5(json.dumps(settings, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+# True when the reports were written, OLAP_UNCHANGED when skipped by the manifest, False on failure
+def generate_olap_reports(project_id, project_base, reporting_week, target, engine=None, manifest=None):
+    if engine is None:
+        with OlapEngine() as own_engine:
+            return generate_olap_reports(project_id, project_base, reporting_week, target, engine=own_engine, manifest=manifest)
 
-def generate_olap_reports(project_id, project_base, reporting_week, target):
     reporting_week_str = pd.to_datetime(reporting_week, errors="coerce").strftime("%Y-%m-%d")
     olap_folder = os.path.join(OLAP_BASE_FOLDER, project_id, reporting_week_str)
     os.makedirs(olap_folder, exist_ok=True)
+
+    # Incremental: the report set is skipped when its input Parquet files and settings are unchanged
+    incremental = manifest is not None and isinstance(project_base, str) and project_id not in (CBV2_PROJECT_ID, EB_PROJECT_ID)
+    if incremental:
+        manifest_key = (project_id, reporting_week_str, project_base)
+        inputs = manifest.input_state(manifest_key, week_parquet_pattern(project_id, project_base, reporting_week))
+        fingerprint = report_fingerprint(project_base, target)
+        if inputs and manifest.is_current(manifest_key, inputs, fingerprint):
+            print(f"OLAP reports up to date for {project_id} // {reporting_week_str} ({len(inputs)} input files unchanged)")
+            return OLAP_UNCHANGED
+
+    # Project-week Parquet files are read once, all reports run on the loaded rows
+    if engine.load_week(project_id, project_base, reporting_week) is None:
+        return False
     
-    for query_name in ["smr-workflow", "smr-rater-label", "smr-job-label", "smr-rubric-analysis", "smr-error-contribution", "dmp-job-incorrect"]:
-        if query_name == "smr-rubric-analysis" and project_base != "halo":
-            continue
-        
+    report_paths = []
+    for query_name in report_queries(project_base):
         report_name = project_id + "_" + reporting_week_str + "_" + project_base + "_" + query_name + ".csv"
         
-        report_df = olap_query_run(query_name, project_base, project_id, reporting_week, target)
-
         report_path = os.path.join(olap_folder, report_name)
+
+        # Parquet: the typed DuckDB result is written as is, the CSV (if any) is rendered from it
+        if "parquet" in cfg.OLAP_EXPORT_FORMATS:
+            report_table = engine.run(query_name, project_base, target, as_arrow=True)
+            if report_table is None:
+                logger.error(f"OLAP report {query_name} failed for {project_id} // {reporting_week_str}")
+                return False
+            parquet_path = pu.olap_report_parquet_path(report_path)
+            pu.write_parquet_table(pu.enforce_report_schema(report_table), parquet_path)
+            report_paths.append(parquet_path)
+            if "csv" in cfg.OLAP_EXPORT_FORMATS:
+                pu.save_df_to_filepath(engine.to_df(report_table), report_path)
+                report_paths.append(report_path)
+            continue
+
+        report_df = engine.run(query_name, project_base, target)
+        if report_df is None:
+            logger.error(f"OLAP report {query_name} failed for {project_id} // {reporting_week_str}")
+            return False
+
         pu.save_df_to_filepath(report_df, report_path)
+        report_paths.append(report_path)
     
 
     # Override for CB and EB
-    CBV2_PROJECT_ID = "a01Hs00001ocUa0IAE"
-    EB_PROJECT_ID = "a01Hs00001ocUZgIAM"
     if project_id == CBV2_PROJECT_ID or project_id == EB_PROJECT_ID:
         overwrite_olap(project_id, reporting_week_str)
 
+    if incremental:
+        manifest.record(manifest_key, inputs, fingerprint, report_paths)
+
     return True
 
 
 
-def olap_sync():
+def olap_sync(workers=None):
     total_olap_sync_items = transformation_queue.count(status="olap_sync_ready")
 
     print(f"[INFO] OLAP Sync Phase Started ({total_olap_sync_items} items)")
     logger.info(f"OLAP Sync Phase Started ({total_olap_sync_items} items)")
 
+    # Items are claimed per project-week: the reports of a week folder are generated once,
+    # however many of its files were transformed
+    if workers and workers > 1:
+        success_count, unchanged_count, group_count, claimed_count = olap_sync_parallel(total_olap_sync_items, workers)
+    else:
+        success_count, unchanged_count, group_count, claimed_count = olap_sync_serial(total_olap_sync_items)
+
+    if cfg.OLAP_INCREMENTAL:
+        print(f"[INFO] OLAP manifest: {olap_manifest.skipped} project-weeks unchanged, {olap_manifest.generated} generated")
+        olap_manifest.save()
+
+    print(f"[INFO] OLAP Sync Phase Ended ({success_count + unchanged_count}/{total_olap_sync_items} items synced, {unchanged_count} of them unchanged, {group_count} project-weeks, {claimed_count - group_count} redundant runs avoided)")
+    logger.info(f"OLAP Sync Phase Ended ({success_count + unchanged_count}/{total_olap_sync_items} items synced, {unchanged_count} of them unchanged, {group_count} project-weeks, {claimed_count - group_count} redundant runs avoided)")
+
+    # Only items whose reports were actually written count as OLAP updates
+    return success_count
+
+
+def describe_group(olap_sync_group):
+    first = olap_sync_group[0]
+    item_ids = ", ".join(item['item_id'] for item in olap_sync_group)
+    return f"ID {item_ids}: {first['project_id']} | {first['project_name']} // {first['data_week']}"
+
+
+def sync_group(olap_sync_group, engine):
+    project_id = olap_sync_group[0]['project_id']
+    target = pu.get_project_target(project_id, project_list_df)
+    project_base = pu.get_project_base(project_id, project_list_df)
+    reporting_week = olap_sync_group[0]['data_week']
+
+    item_ids = [item['item_id'] for item in olap_sync_group]
+    with transformation_queue.lease_keeper(item_ids):
+        return generate_olap_reports(project_id, project_base, reporting_week, target, engine=engine, manifest=olap_manifest if cfg.OLAP_INCREMENTAL else None)
+
+
+def olap_sync_serial(total_olap_sync_items):
     success_count = 0
-   
-    for i in range(total_olap_sync_items):
-        olap_sync_item = transformation_queue.pop(mode="olap_sync_ready")
-        if not olap_sync_item:
-            logger.warning(f"Queue empty before expected!")
-            break
-        olap_sync_item_id = olap_sync_item['item_id']
-        print(f"[{i+1}/{total_olap_sync_items}] Processing ID {olap_sync_item_id}: {olap_sync_item['project_id']} | {olap_sync_item['project_name']} // {olap_sync_item['data_week']}")
-
-        project_id = olap_sync_item['project_id']
-        target = pu.get_project_target(project_id, project_list_df)
-        project_base = pu.get_project_base(project_id, project_list_df)
-
-        #print(f"\nTarget: {target} - Project Base: {project_base}")
-        
-        reporting_week = olap_sync_item['data_week']
-        outcome_success = generate_olap_reports(project_id, project_base, reporting_week, target)
+    unchanged_count = 0
+    group_count = 0
+    claimed_count = 0
+    engine = OlapEngine() # one DuckDB connection for the whole run
+    # Leases of failed groups are given back when the run ends: not retried by this run,
+    # but claimable by the next one at once
+    failed_item_ids = []
+
+    try:
+        while claimed_count < total_olap_sync_items:
+            olap_sync_group = transformation_queue.pop_group(mode="olap_sync_ready")
+            if not olap_sync_group:
+                logger.warning(f"Queue empty before expected!")
+                break
+            group_count += 1
+            claimed_count += len(olap_sync_group)
+            print(f"[{claimed_count}/{total_olap_sync_items}] Processing {describe_group(olap_sync_group)}")
+
+            item_ids = [item['item_id'] for item in olap_sync_group]
+            try:
+                outcome_success = sync_group(olap_sync_group, engine)
+            except BaseException:
+                failed_item_ids.extend(item_ids)
+                raise
+            if outcome_success:
+                marked = transformation_queue.mark_olap_synced_many(item_ids)
+                if outcome_success == OLAP_UNCHANGED:
+                    unchanged_count += len(marked)
+                else:
+                    success_count += len(marked)
+            else:
+                print("Olap Sync Failed!")
+                failed_item_ids.extend(item_ids)
+    finally:
+        engine.close()
+        transformation_queue.release_leases(failed_item_ids)
+        log_olap_timings([engine])
+
+    return success_count, unchanged_count, group_count, claimed_count
+
+
+def log_olap_timings(engines):
+    totals = {}
+    for engine in engines:
+        for query_name, timing in engine.timing_summary().items():
+            runs, seconds = totals.get(query_name, (0, 0.0))
+            totals[query_name] = (runs + timing["runs"], seconds + timing["seconds"])
+    for query_name, (runs, seconds) in totals.items():
+        logger.info(f"OLAP timing {query_name}: {runs} runs, {seconds:.3f}s")
+
+
+# --- Parallel OLAP sync: project-weeks are independent, each worker thread has its own
+# DuckDB connection. Cores are split across connections instead of every connection
+# using all of them.
+
+def olap_sync_parallel(total_olap_sync_items, workers):
+    threads_per_engine = max(1, (os.cpu_count() or 1) // workers)
+    logger.info(f"Parallel OLAP sync: {workers} workers, {threads_per_engine} DuckDB threads each")
+
+    local = threading.local()
+    engines = []
+    engines_lock = threading.Lock()
+    claimed = {"groups": 0, "items": 0}
+    failed_item_ids = [] # leases given back when the run ends (see olap_sync_serial)
+
+    def get_engine():
+        if getattr(local, "engine", None) is None:
+            local.engine = OlapEngine(threads=threads_per_engine)
+            with engines_lock:
+                engines.append(local.engine)
+        return local.engine
+
+    def sync_next_group():
+        olap_sync_group = transformation_queue.pop_group(mode="olap_sync_ready")
+        if not olap_sync_group:
+            return None, False, []
+        with engines_lock:
+            claimed["groups"] += 1
+            claimed["items"] += len(olap_sync_group)
+            i = claimed["items"]
+        print(f"[{i}/{total_olap_sync_items}] Processing {describe_group(olap_sync_group)}")
+
+        try:
+            outcome_success = sync_group(olap_sync_group, get_engine())
+        except Exception as e:
+            logger.error(f"OLAP sync error on {describe_group(olap_sync_group)}: {e}")
+            outcome_success = False
+
+        # Recorded as soon as the group is done, while this worker still holds its leases:
+        # a finished group is never claimable again, even by a long run or after a crash
+        marked = []
         if outcome_success:
-            #print("Olap Sync SUCCESS!")
-            transformation_queue.mark_olap_synced(olap_sync_item_id)
-            success_count += 1
+            marked = transformation_queue.mark_olap_synced_many([item['item_id'] for item in olap_sync_group])
         else:
-            print("Olap Sync Failed!")
+            with engines_lock:
+                failed_item_ids.extend(item['item_id'] for item in olap_sync_group)
+        return olap_sync_group, outcome_success, marked
 
+    # One task per item at most: tasks finding the queue empty (items taken by a group) return at once
+    success_count = 0
+    unchanged_count = 0
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(sync_next_group) for _ in range(total_olap_sync_items)]
+            for future in as_completed(futures):
+                olap_sync_group, outcome_success, marked = future.result()
+                if olap_sync_group is None:
+                    continue
+                if outcome_success == OLAP_UNCHANGED:
+                    unchanged_count += len(marked)
+                else:
+                    success_count += len(marked)
+                if not outcome_success:
+                    print(f"Olap Sync Failed! ({describe_group(olap_sync_group)})")
+    finally:
+        # The executor block only exits once every worker is done: no engine is in use here
+        for engine in engines:
+            engine.close()
+        transformation_queue.release_leases(failed_item_ids)
+        log_olap_timings(engines)
 
-    print(f"[INFO] OLAP Sync Phase Ended ({total_olap_sync_items} items synced)")
-    logger.info(f"OLAP Sync Phase Ended ({total_olap_sync_items} items synced)")
-
-    return success_count
\ No newline at end of file
+    return success_count, unchanged_count, claimed["groups"], claimed["items"]
@@ -1,15 +1,21 @@
 import pandas as pd
 from pandas.errors import ParserError
 import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
 import csv
 import json
 import re
 import os
 import ast
 import hashlib
+import threading
+from openpyxl import load_workbook
 from datetime import datetime, timedelta, timezone
 from pipeline_lib.config import DATASET_HEADER, DATA_LOG_DIR_PATH, START_DATE_DEFAULT
 from pipeline_lib.config import UQ_V2_SCHEMA
+from pipeline_lib.config import PARQUET_DICTIONARY_COLUMNS, PARQUET_DATE_COLUMNS, PARQUET_NUMERIC_TYPES
+from pipeline_lib.config import PARQUET_ROW_GROUP_SIZE, PARQUET_COMPRESSION, PARQUET_COMPRESSION_LEVEL
 
 # --- Logger
 import logging
@@ -516,34 +522,97 @@ def save_df_to_filepath(df, output_path):
     )
 
 def has_at_least_one_data_row(file_path):
-    try:
-        if file_path.lower().endswith(".csv"):
-            df_sample = pd.read_csv(file_path, nrows=2)
-        elif file_path.lower().endswith((".xls", ".xlsx")):
-            df_sample = pd.read_excel(file_path, nrows=2)
-        else:
-            return False  # unsupported extension
-        return len(df_sample) >= 1
-    except Exception as e:
-        logging.warning(f"Error reading file {file_path}: {e}")
-        return False
+    return probe_file(file_path)["has_data_row"]
 
 # PROJECT FOLDERS AND WEEK FOLDERS
 
+# Per-run index of the rawdata tree: one scandir of the root (project_id -> folder),
+# week folders listed lazily once per project. Must be invalidated when folders are created.
+class RawdataFolderIndex:
+    def __init__(self, rawdata_root):
+        self.rawdata_root = rawdata_root
+        self._lock = threading.RLock()
+        self._project_folders = None    # folder names, scandir order
+        self._project_map = None        # project_id prefix -> folder name
+        self._week_folders = {}         # project folder name -> {week folder name: path}
+
+    def _load_project_folders(self):
+        try:
+            with os.scandir(self.rawdata_root) as it:
+                folders = [entry.name for entry in it if entry.is_dir()]
+        except FileNotFoundError:
+            logger.error(f"Root folder not found: {self.rawdata_root}")
+            raise FileNotFoundError(f"Root folder not found: {self.rawdata_root}")
+
+        project_map = {}
+        for folder in folders:
+            if "_" in folder:
+                project_map.setdefault(folder.split("_", 1)[0], folder)
+
+        self._project_folders = folders
+        self._project_map = project_map
+
+    def project_folder_name(self, project_id):
+        with self._lock:
+            if self._project_folders is None:
+                self._load_project_folders()
+
+            folder = self._project_map.get(project_id)
+            if folder is None and "_" in project_id:
+                # IDs containing '_' cannot be keyed by prefix: fall back to a linear match
+                folder = next((f for f in self._project_folders if f.startswith(f"{project_id}_")), None)
+            return folder
+
+    def week_folders(self, project_folder_name):
+        with self._lock:
+            if project_folder_name not in self._week_folders:
+                project_folder_path = os.path.join(self.rawdata_root, project_folder_name)
+                try:
+                    with os.scandir(project_folder_path) as it:
+                        weeks = {entry.name: entry.path for entry in it if entry.is_dir()}
+                except FileNotFoundError:
+                    weeks = {}
+                self._week_folders[project_folder_name] = weeks
+            return self._week_folders[project_folder_name]
+
+    def invalidate(self, project_folder_name=None):
+        with self._lock:
+            if project_folder_name is None:
+                self._project_folders = None
+                self._project_map = None
+                self._week_folders = {}
+            else:
+                self._week_folders.pop(project_folder_name, None)
+
+
+_rawdata_folder_indexes = {}
+_rawdata_folder_indexes_lock = threading.Lock()
+
+def get_rawdata_folder_index(rawdata_root):
+    with _rawdata_folder_indexes_lock:
+        index = _rawdata_folder_indexes.get(rawdata_root)
+        if index is None:
+            index = RawdataFolderIndex(rawdata_root)
+            _rawdata_folder_indexes[rawdata_root] = index
+        return index
+
+def reset_rawdata_folder_index():
+    # Call at the start of each run: the index is a per-run cache
+    with _rawdata_folder_indexes_lock:
+        _rawdata_folder_indexes.clear()
+
+def invalidate_rawdata_folder_index(rawdata_root, project_folder_name=None):
+    get_rawdata_folder_index(rawdata_root).invalidate(project_folder_name)
+
+
 def get_project_folder(project_id, rawdata_root):
     logger.debug(f"Getting Project Folder of Project ID: {project_id}")
     if not isinstance(project_id, str) or not project_id.strip():
         logger.error(f"Invalid project ID provided: {project_id}")
         raise ValueError("Invalid project ID provided.")
-    try:
-        folders = [f for f in os.listdir(rawdata_root) if os.path.isdir(os.path.join(rawdata_root, f))]
-    except FileNotFoundError:
-        logger.error(f"Root folder not found: {rawdata_root}")
-        raise FileNotFoundError(f"Root folder not found: {rawdata_root}")
-
-    # Filter folders that start with the given project_id
-    project_folders = [f for f in folders if f.startswith(f"{project_id}_")]
-    exists = bool(project_folders)
+
+    project_folder_name = get_rawdata_folder_index(rawdata_root).project_folder_name(project_id)
+    exists = project_folder_name is not None
     logger.debug(f"Project ID: {project_id} - Project Folder exists {exists}")
 
     if not exists:
@@ -553,8 +622,6 @@ def get_project_folder(project_id, rawdata_root):
             "path": None
         }
 
-    # Take the first matching folder (assuming project_id is unique)
-    project_folder_name = project_folders[0]
     project_folder_path = os.path.join(rawdata_root, project_folder_name)
     logger.debug(f"Project ID: {project_id} - Project Folder name {project_folder_name}")
 
@@ -592,9 +659,10 @@ def get_week_folder(data_week, project_id, rawdata_root):
     
     project_folder_name = project_folder_info["name"]
     week_folder_path = os.path.join(rawdata_root, project_folder_name, week_folder_name)
+    week_folders = get_rawdata_folder_index(rawdata_root).week_folders(project_folder_name)
     logger.debug(f"Returning project-week folder for: {project_id} - {week_folder_name}")
     return {
-        "exists": bool(os.path.isdir(week_folder_path)),
+        "exists": week_folder_name in week_folders,
         "name": week_folder_name,
         "path": week_folder_path
     }
@@ -631,49 +699,85 @@ def compare_files_list(prev, curr):
 
 
 # DATASET TYPE UTILS
-def get_dataset_type(file_path):
-    dataset_type = DATASET_HEADER
+
+def _is_blank_row(row):
+    return all(v is None or str(v).strip() == "" for v in row)
+
+def _is_blank_csv_row(row):
+    # pandas skip_blank_lines: only empty / whitespace-only lines are blank,
+    # a line with delimiters only (",,,") is a data row of empty values
+    return len(row) == 0 or (len(row) == 1 and row[0].strip() == "")
+
+def _probe_rows(rows, is_blank=_is_blank_row):
+    # Header is the first non-blank row, data is any following non-blank row
+    header = None
+    for row in rows:
+        if is_blank(row):
+            continue
+        if header is None:
+            header = ["" if v is None else str(v).strip() for v in row]
+            continue
+        return header, True
+    return header or [], False
+
+def _probe_csv(file_path):
+    with open(file_path, "r", newline="", encoding="utf-8-sig") as f:
+        return _probe_rows(csv.reader(f), is_blank=_is_blank_csv_row)
+
+def _probe_excel(file_path):
+    wb = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        # Same sheet load_df_from_filepath ingests: 'spotcheck_data' if present, sheet[0] otherwise
+        ws = wb["spotcheck_data"] if "spotcheck_data" in wb.sheetnames else wb.worksheets[0]
+        return _probe_rows(ws.iter_rows(values_only=True))
+    finally:
+        wb.close()
+
+def _probe_xls(file_path):
+    # Legacy .xls is not readable by openpyxl: pandas (xlrd, if installed), first rows only
+    df = pd.read_excel(file_path, nrows=2, dtype=str)
+    return [str(c).strip() for c in df.columns], len(df) >= 1
+
+def detect_dataset_type(header):
+    header_set = set(header)
+    for dtype, required_cols in DATASET_HEADER.items():
+        if header_set.issuperset(required_cols):
+            return dtype
+    return None
+
+# Opens the file once and returns header, data row presence and detected DATASET_HEADER type
+def probe_file(file_path):
+    probe = {"header": [], "has_data_row": False, "dataset_type": None}
 
     if not os.path.exists(file_path):
-        #logger.error(f"File not found: {file_path}")
-        return None
+        return probe
 
     try:
         if file_path.lower().endswith(".csv"):
-            df = pd.read_csv(file_path, nrows=0, dtype=str)
-
-        elif file_path.lower().endswith((".xls", ".xlsx")):
-            # Try spotcheck_data sheet first
+            header, has_data_row = _probe_csv(file_path)
+        elif file_path.lower().endswith(".xlsx"):
+            header, has_data_row = _probe_excel(file_path)
+        elif file_path.lower().endswith(".xls"):
             try:
-                df = pd.read_excel(
-                    file_path,
-                    sheet_name="spotcheck_data",
-                    nrows=0,
-                    dtype=str,
-                    engine="openpyxl"
-                )
-            except ValueError:
-                # Sheet does not exist: fallback
-                df = pd.read_excel(
-                    file_path,
-                    sheet_name=0,
-                    nrows=0,
-                    dtype=str,
-                    engine="openpyxl"
-                )
+                header, has_data_row = _probe_xls(file_path)
+            except Exception as e:
+                # Kept as rawdata: reading (and reporting a failure) is left to the loader
+                logging.warning(f"Cannot probe .xls file {file_path}, kept without header: {e}")
+                header, has_data_row = [], True
         else:
-            return None
-
-    except Exception:
-        return None
+            return probe  # unsupported extension
+    except Exception as e:
+        logging.warning(f"Error reading file {file_path}: {e}")
+        return probe
 
-    header = df.columns.str.strip().tolist()
+    probe["header"] = header
+    probe["has_data_row"] = has_data_row
+    probe["dataset_type"] = detect_dataset_type(header)
+    return probe
 
-    for dtype, required_cols in dataset_type.items():
-        if set(required_cols).issubset(header):
-            return dtype
 
-    return None
+def get_dataset_type(file_path):
+    return probe_file(file_path)["dataset_type"]
 
 
 def check_dataset_type(file_path, dataset_type):
@@ -713,6 +817,95 @@ def convert_to_uqv2(df: pd.DataFrame, schema=UQ_V2_SCHEMA) -> pd.DataFrame:
     return uqv2_df
 
 
+# Arrow table with the enforced output schema: dictionary encoded strings, date32 weeks/dates
+# and fixed (lossless) numeric types. Other columns keep the types pandas/pyarrow infer.
+def enforce_parquet_schema(df: pd.DataFrame) -> pa.Table:
+    table = pa.Table.from_pandas(df, preserve_index=False)
+
+    for i, name in enumerate(table.column_names):
+        col = table.column(i)
+
+        if name in PARQUET_DATE_COLUMNS:
+            if not pa.types.is_date32(col.type):
+                dates = pd.to_datetime(df[name], errors="coerce").dt.normalize()
+                col = pa.array(dates, type=pa.timestamp("ns"), from_pandas=True).cast(pa.date32())
+
+        elif name in PARQUET_DICTIONARY_COLUMNS:
+            if pa.types.is_dictionary(col.type):
+                col = col.cast(col.type.value_type)
+            if pa.types.is_null(col.type) or pa.types.is_string(col.type) or pa.types.is_large_string(col.type):
+                col = col.cast(pa.string()).dictionary_encode()
+
+        elif name in PARQUET_NUMERIC_TYPES:
+            target = pa.type_for_alias(PARQUET_NUMERIC_TYPES[name])
+            try:
+                col = col.cast(target)  # safe cast: fails instead of losing values
+            except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+                logger.warning(f"Column '{name}' kept as {col.type}, cannot cast to {target}: {e}")
+
+        elif pa.types.is_dictionary(col.type):
+            # categoricals left by the transformers (e.g. job_id from to_long) are written plain
+            col = col.cast(col.type.value_type)
+
+        table = table.set_column(i, name, col)
+
+    # pandas metadata would describe the pre-cast dtypes
+    return table.replace_schema_metadata(None)
+
+
+# Split row-aligned tables by key values in a single pass: one stable sort, then zero-copy slices.
+# Yields (key, [slice of each table]) with keys in order of first appearance.
+def split_tables_by_key(keys: pd.Series, *tables: pa.Table):
+    codes, uniques = pd.factorize(keys, use_na_sentinel=False)
+    order = np.argsort(codes, kind="stable")
+    sorted_tables = [t.take(order) for t in tables]
+    bounds = np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=len(uniques)))])
+
+    for i, key in enumerate(uniques.tolist()):
+        start, end = int(bounds[i]), int(bounds[i + 1])
+        yield key, [t.slice(start, end - start) for t in sorted_tables]
+
+
+def write_parquet_table(table: pa.Table, path):
+    pq.write_table(
+        table,
+        path,
+        row_group_size=PARQUET_ROW_GROUP_SIZE,
+        compression=PARQUET_COMPRESSION,
+        compression_level=PARQUET_COMPRESSION_LEVEL
+    )
+
+
+# OLAP report schema: the DuckDB result types, with the types Power BI / pandas handle poorly
+# replaced (HUGEINT sums come out as decimal128(38, 0)).
+def enforce_report_schema(table: pa.Table) -> pa.Table:
+    fields = []
+    for field in table.schema:
+        if pa.types.is_decimal(field.type):
+            fields.append(field.with_type(pa.int64() if field.type.scale == 0 else pa.float64()))
+        elif pa.types.is_null(field.type) or pa.types.is_large_string(field.type):
+            fields.append(field.with_type(pa.string()))
+        else:
+            fields.append(field)
+    return table.cast(pa.schema(fields))
+
+
+# OLAP report reader: the Parquet copy of a CSV report is preferred when it exists and is not
+# older than the CSV (CSV reports can be overwritten on their own, e.g. by baits_exception)
+def olap_report_parquet_path(csv_path):
+    return os.path.splitext(csv_path)[0] + ".parquet"
+
+def olap_report_exists(csv_path):
+    return os.path.exists(csv_path) or os.path.exists(olap_report_parquet_path(csv_path))
+
+def read_olap_report(csv_path):
+    parquet_path = olap_report_parquet_path(csv_path)
+    if os.path.exists(parquet_path):
+        if not os.path.exists(csv_path) or os.path.getmtime(parquet_path) >= os.path.getmtime(csv_path):
+            return pd.read_parquet(parquet_path)
+    return pd.read_csv(csv_path)
+
+
 # HASH UTILS
 
 def hash_header(file_path):
@@ -728,8 +921,12 @@ def hash_header(file_path):
     else:
         raise ValueError(f"Hash_Header - Unsupported file type: {file_path}")
     
+    return hash_header_columns(df.columns)
+
+
+def hash_header_columns(columns):
     # Hash of sorted columns
-    sorted_columns = sorted(df.columns.astype(str))
+    sorted_columns = sorted(str(col) for col in columns)
     header_string = '|'.join(sorted_columns).strip()
     md5_hash = hashlib.md5(header_string.encode('utf-8')).hexdigest()
 
@@ -759,58 +956,74 @@ def hash_file(file_path):
     return hasher.hexdigest()
 
 
+_directory_log_lock = threading.Lock() # week folders can be hashed from scanner threads
+
 def log_directory_contents(df):
     dir_log_file = os.path.join(DATA_LOG_DIR_PATH, "directory_log.csv")
 
-    if os.path.exists(dir_log_file):
-        df.to_csv(dir_log_file, mode='a', header=False, index=False)
-    else:
-        df.to_csv(dir_log_file, mode='w', header=True, index=False)
+    with _directory_log_lock:
+        if os.path.exists(dir_log_file):
+            df.to_csv(dir_log_file, mode='a', header=False, index=False)
+        else:
+            df.to_csv(dir_log_file, mode='w', header=True, index=False)
+
 
+HASHED_FILE_EXTS = {".csv", ".xlsx", ".xls"}
 
-def hash_directory_fast(folder_path, is_active):
+def _walk_with_sizes(folder_path):
+    for root, dirs, files in os.walk(folder_path):
+        file_sizes = {}
+        for filename in files:
+            size = None
+            if os.path.splitext(filename)[1].lower() in HASHED_FILE_EXTS:
+                try:
+                    size = os.path.getsize(os.path.join(root, filename))
+                except OSError:
+                    pass  # skip inaccessible files
+            file_sizes[filename] = size
+        yield root, dirs, file_sizes
+
+
+def hash_directory_fast(folder_path, is_active, stat_tree=None):
     hasher = hashlib.md5()
     base_folder = os.path.basename(folder_path)
     hasher.update(base_folder.encode("utf-8", errors="ignore"))
     hasher.update(str(is_active).encode("utf-8"))
 
-    valid_ext = {".csv", ".xlsx", ".xls"}
     file_info = []
 
     # For logging
-    log_dir_content_df = pd.DataFrame(columns=["timestamp", "root", "dirs", "files"])
+    log_dir_rows = []
 
-    for root, dirs, files in os.walk(folder_path):
+    # Unchanged folders (same mtime) are served from the stat tree without listing/stat'ing their files
+    walker = stat_tree.walk(folder_path) if stat_tree is not None else _walk_with_sizes(folder_path)
+
+    for root, dirs, file_sizes in walker:
         # Logging directory content
         log_dir_timestamp = datetime.now(timezone.utc).isoformat(timespec="seconds")
-        log_dir_content_df = pd.concat([log_dir_content_df, pd.DataFrame([{"timestamp": log_dir_timestamp, "root": root, "dirs": dirs, "files": files}])], ignore_index=True)
+        log_dir_rows.append({"timestamp": log_dir_timestamp, "root": root, "dirs": dirs, "files": list(file_sizes)})
 
-        for filename in files:
+        for filename, size in file_sizes.items():
             ext = os.path.splitext(filename)[1].lower()
-            if ext not in valid_ext:
+            if ext not in HASHED_FILE_EXTS or size is None:
                 continue
 
             full_path = os.path.join(root, filename)
             relative_path = os.path.relpath(full_path, folder_path)
 
-            try:
-                size = os.path.getsize(full_path)
-                
-                #mtime = os.path.getmtime(full_path)
-                #dt = datetime.fromtimestamp(mtime)
-                #mtime_hour = dt.replace(minute=0, second=0, microsecond=0).timestamp()
-                #entry = f"{relative_path}:{size}:{int(mtime_hour)}"
-
-                entry = f"{relative_path}:{size}"
-                file_info.append(entry)
-            except OSError:
-                continue  # skip inaccessible files
+            #mtime = os.path.getmtime(full_path)
+            #dt = datetime.fromtimestamp(mtime)
+            #mtime_hour = dt.replace(minute=0, second=0, microsecond=0).timestamp()
+            #entry = f"{relative_path}:{size}:{int(mtime_hour)}"
+
+            entry = f"{relative_path}:{size}"
+            file_info.append(entry)
 
     for entry in sorted(file_info):  # ensure consistent order
         hasher.update(entry.encode("utf-8", errors="ignore"))
     
     # Log directory content
-    log_directory_contents(log_dir_content_df)
+    log_directory_contents(pd.DataFrame(log_dir_rows, columns=["timestamp", "root", "dirs", "files"]))
 
     return hasher.hexdigest()
 
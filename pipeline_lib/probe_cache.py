@@ -0,0 +1,173 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from pipeline_lib.config import DATASET_HEADER
+
+# --- Logger
+import logging
+logger = logging.getLogger(__name__)
+
+
+# Persistent cache of file probe results, keyed by (relative path, size, mtime_ns).
+# Entries are only valid for the DATASET_HEADER definition they were computed with.
+class ProbeCache:
+    def __init__(self, filepath, max_entries=200000, max_age_days=180):
+        self.filepath = filepath
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self.columns = [
+            'rel_path',
+            'size',
+            'mtime_ns',
+            'header_hash',
+            'dataset_type',
+            'has_data_row',
+            'regex_pattern',
+            'regex_matched',
+            'last_used'
+        ]
+        self._lock = threading.Lock()
+        self._entries = None
+        self._dirty = set()
+        self.hits = 0
+        self.misses = 0
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.filepath, timeout=30)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def _init_db(self, conn):
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS probe_cache (
+                rel_path        TEXT PRIMARY KEY,
+                size            INTEGER NOT NULL,
+                mtime_ns        INTEGER NOT NULL,
+                header_hash     TEXT,
+                dataset_type    TEXT,
+                has_data_row    INTEGER NOT NULL,
+                regex_pattern   TEXT,
+                regex_matched   INTEGER,
+                last_used       REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_pc_last_used ON probe_cache (last_used)")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS cache_meta (
+                key     TEXT PRIMARY KEY,
+                value   TEXT NOT NULL
+            )
+        """)
+
+    def _dataset_header_hash(self):
+        return hashlib.md5(json.dumps(DATASET_HEADER, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def load(self):
+        with self._lock:
+            self._load()
+
+    def _load(self):
+        folder = os.path.dirname(self.filepath)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        with self._connect() as conn:
+            self._init_db(conn)
+
+            # Dataset types depend on DATASET_HEADER: drop everything if it changed
+            header_hash = self._dataset_header_hash()
+            stored = conn.execute("SELECT value FROM cache_meta WHERE key = 'dataset_header_hash'").fetchone()
+            if stored is None or stored[0] != header_hash:
+                with conn:
+                    conn.execute("DELETE FROM probe_cache")
+                    conn.execute("INSERT OR REPLACE INTO cache_meta (key, value) VALUES ('dataset_header_hash', ?)", (header_hash,))
+
+            rows = conn.execute(f"SELECT {', '.join(self.columns)} FROM probe_cache").fetchall()
+
+        self._entries = {row[0]: dict(zip(self.columns, row)) for row in rows}
+        self._dirty = set()
+        self.hits = 0
+        self.misses = 0
+        logger.debug(f"Probe cache loaded: {len(self._entries)} entries")
+
+    def get(self, rel_path, size, mtime_ns):
+        with self._lock:
+            if self._entries is None:
+                self._load()
+
+            entry = self._entries.get(rel_path)
+            if entry is None or entry["size"] != size or entry["mtime_ns"] != mtime_ns:
+                self.misses += 1
+                return None
+
+            entry["last_used"] = time.time()
+            self._dirty.add(rel_path)
+            self.hits += 1
+            return dict(entry)
+
+    def put(self, rel_path, size, mtime_ns, entry):
+        with self._lock:
+            if self._entries is None:
+                self._load()
+
+            record = {col: entry.get(col) for col in self.columns}
+            record["rel_path"] = rel_path
+            record["size"] = size
+            record["mtime_ns"] = mtime_ns
+            record["last_used"] = time.time()
+            self._entries[rel_path] = record
+            self._dirty.add(rel_path)
+
+    def save(self):
+        with self._lock:
+            if self._entries is None:
+                return
+
+            records = [self._entries[rel_path] for rel_path in self._dirty if rel_path in self._entries]
+            placeholders = ", ".join("?" for _ in self.columns)
+            cutoff = time.time() - self.max_age_days * 86400
+
+            with self._connect() as conn, conn:
+                conn.executemany(
+                    f"INSERT OR REPLACE INTO probe_cache ({', '.join(self.columns)}) VALUES ({placeholders})",
+                    [tuple(record[col] for col in self.columns) for record in records]
+                )
+
+                # Eviction: age first, then least recently used beyond max_entries
+                evicted = conn.execute("DELETE FROM probe_cache WHERE last_used < ?", (cutoff,)).rowcount
+                evicted += conn.execute(
+                    "DELETE FROM probe_cache WHERE rel_path IN ("
+                    "SELECT rel_path FROM probe_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                ).rowcount
+
+            self._dirty = set()
+            # Evicted rows may still be in memory: reload on next access
+            if evicted:
+                self._entries = None
+
+        logger.info(f"Probe cache saved: {len(records)} entries written, {evicted} evicted (hits={self.hits}, misses={self.misses})")
+
+    def clear(self):
+        with self._lock:
+            folder = os.path.dirname(self.filepath)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            with self._connect() as conn:
+                self._init_db(conn)
+                with conn:
+                    conn.execute("DELETE FROM probe_cache")
+            self._entries = {}
+            self._dirty = set()
+            self.hits = 0
+            self.misses = 0
+        logger.info("Probe cache cleared")
@@ -29,7 +29,7 @@ def cvs_extract_labels(json_str):
         json_str = json_str.replace("'", '"')
 
         # Parse first-level JSON
-        first_level_json = json.loads(json_str)
+        first_level_json = tu.json_loads(json_str)
         #logging.debug(f"PARSED {type(first_level_json)} {repr(first_level_json)}")
 
         first_level_key = next(iter(first_level_json), None)
@@ -51,7 +51,7 @@ def cvs_extract_labels(json_str):
 
             if nested_json_str and isinstance(nested_json_str, str):
                 # Parse the nested JSON string
-                nested_data = json.loads(nested_json_str)
+                nested_data = tu.json_loads(nested_json_str)
                 #logging.debug(f"Parsed nested Auditor JSON: {nested_data}")
                 # Extract auditor labels
                 auditor_labels = nested_data.get("labels", None)
@@ -124,7 +124,7 @@ def cvs_transform(df, stats, mod_config):
     df.rename(columns=column_map, inplace=True)
 
     # Fix date format and remove rows with incorrect dates
-    df["job_date"] = df["job_date"].apply(tu.convert_tricky_date)
+    df["job_date"] = tu.convert_tricky_dates(df["job_date"])
     stats["skipped_invalid_datetime"] = int(df["job_date"].isnull().sum())
     df = df[df["job_date"].notnull()].copy()
 
@@ -140,10 +140,10 @@ def cvs_transform(df, stats, mod_config):
     df["auditor_decision_data"] = df["auditor_decision_data"].fillna("").str.replace(";", ",")
 
     # Parse Rater JSON
-    df['rater_labels'] = [cvs_extract_labels(x) for x in df["rater_decision_data"]]
+    df['rater_labels'] = tu.extract_labels_batch(df["rater_decision_data"], cvs_extract_labels)
 
     # Parse Auditor JSON (extract auditor_id and auditor_labels if CVS)
-    parsed_auditor = [cvs_extract_labels(x) for x in df["auditor_decision_data"]]
+    parsed_auditor = tu.extract_labels_batch(df["auditor_decision_data"], cvs_extract_labels)
     df["auditor_id"] = [x[0] for x in parsed_auditor]
     df["auditor_labels"] = [x[1] for x in parsed_auditor]
 
@@ -161,10 +161,8 @@ def cvs_transform(df, stats, mod_config):
     df = df[~(mask_rater | mask_auditor)].copy()
 
     # ID Format check
-    df["rater_id"] = df["rater_id"].apply(tu.id_format_check)
-    df["job_id"] = df["job_id"].apply(tu.id_format_check)
+    mask_invalid_id = tu.check_id_columns(df, ["rater_id", "job_id"])
     # Count invalid IDs
-    mask_invalid_id = df[["rater_id", "job_id"]].isnull().any(axis=1)
     stats["skipped_invalid_id"] = int(mask_invalid_id.sum())
     # Remove from df
     df = df[~mask_invalid_id].copy()
@@ -219,21 +219,18 @@ def generic_transform(df, stats, mod_config):
 
 
     # Fix date format and remove rows with incorrect dates
-    df["job_date"] = df["job_date"].apply(tu.convert_tricky_date)
+    df["job_date"] = tu.convert_tricky_dates(df["job_date"])
     stats["skipped_invalid_datetime"] = int(df["job_date"].isnull().sum())
     df = df[df["job_date"].notnull()].copy()
 
 
     # ID Format check
-    df["job_id"] = df["job_id"].apply(tu.id_format_check)
-    df["rater_id"] = df["rater_id"].apply(tu.id_format_check)
     mask_cols = ["job_id", "rater_id"]
     if needs_auditor:
-        df["auditor_id"] = df["auditor_id"].apply(tu.id_format_check)
         mask_cols.append("auditor_id")
+    mask_invalid_id = tu.check_id_columns(df, mask_cols)
 
     # Count invalid IDs
-    mask_invalid_id = df[mask_cols].isnull().any(axis=1)
     stats["skipped_invalid_id"] = int(mask_invalid_id.sum())
     # Remove from df
     df = df[~mask_invalid_id].copy()
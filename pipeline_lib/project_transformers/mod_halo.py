@@ -197,7 +197,7 @@ def halo_transform(df, stats, mod_config):
 
 
     # Fix date format and remove rows with incorrect dates
-    df["job_date"] = df["job_date"].apply(tu.convert_tricky_date)
+    df["job_date"] = tu.convert_tricky_dates(df["job_date"])
     # Count excluded rows
     stats["skipped_invalid_datetime"] = int(df["job_date"].isnull().sum())
     # Remove exluded rows
@@ -209,11 +209,8 @@ def halo_transform(df, stats, mod_config):
         df[col] = df[col].astype("string").str.strip("'")
 
     # ID Format check
-    df['rater_id'] = df['rater_id'].apply(tu.id_format_check)
-    df['auditor_id'] = df['auditor_id'].apply(tu.id_format_check)
-    df['job_id'] = df['job_id'].apply(tu.id_format_check)
+    mask_invalid_id = tu.check_id_columns(df, ['rater_id', 'auditor_id', 'job_id'])
     # Count invalid IDs
-    mask_invalid_id = df[['rater_id', 'auditor_id', 'job_id']].isnull().any(axis=1)
     stats["skipped_invalid_id"] = int(mask_invalid_id.sum())
     # Remove from df
     df = df[~mask_invalid_id].copy()
@@ -93,7 +93,7 @@ def uqd_extract_labels(json_str, use_extracted):
         json_str = json_str.replace("'", '"')
 
         # Parse first-level JSON
-        first_level_json = json.loads(json_str)
+        first_level_json = tu.json_loads(json_str)
         
         if use_extracted:
             logger.debug("Using Extracted Data {json_str}")
@@ -130,7 +130,7 @@ def uqd_extract_labels(json_str, use_extracted):
             # Fix JSON formatting in nested response
             nested_str = response_str.replace("'", '"')
             try:
-                response_data = json.loads(nested_str)
+                response_data = tu.json_loads(nested_str)
             except json.JSONDecodeError as e:
                 logger.error(f"Nested JSON Decode Error: {e} - {nested_str}")
                 return []
@@ -269,21 +269,19 @@ def uqd_transform(df, stats, mod_config):
     df.rename(columns=column_map, inplace=True)
 
     # Fix date format and remove rows with incorrect dates
-    df["job_date"] = df["job_date"].apply(tu.convert_tricky_date)
+    df["job_date"] = tu.convert_tricky_dates(df["job_date"])
     stats["skipped_invalid_datetime"] = int(df["job_date"].isnull().sum())
     df = df[df["job_date"].notnull()].copy()
 
 
     # ID Format check
-    df["job_id"] = df["job_id"].apply(tu.id_format_check)
-    df["rater_id"] = df["rater_id"].apply(tu.id_format_check)
     mask_cols = ["job_id", "rater_id"]
     if needs_auditor:
-        df["auditor_id"] = df["auditor_id"].apply(tu.id_format_check)
         mask_cols.append("auditor_id")
-        if ignore_missing_auditor_id:
-            # replace null/nan with a placeholder
-            df["auditor_id"] = df["auditor_id"].fillna("999999999999")
+    tu.check_id_columns(df, mask_cols)
+    if needs_auditor and ignore_missing_auditor_id:
+        # replace null/nan with a placeholder
+        df["auditor_id"] = df["auditor_id"].fillna("999999999999")
         
     # Count invalid IDs
     mask_invalid_id = df[mask_cols].isnull().any(axis=1)
@@ -313,9 +311,9 @@ def uqd_transform(df, stats, mod_config):
     
     # Parse JSON
     logger.debug("Extracting labels")
-    df['rater_labels'] = [uqd_extract_labels(x, use_extracted) for x in df["rater_parse_data"]]
+    df['rater_labels'] = tu.extract_labels_batch(df["rater_parse_data"], uqd_extract_labels, use_extracted)
     if needs_auditor:
-        df['auditor_labels'] = [uqd_extract_labels(x, use_extracted) for x in df["auditor_parse_data"]]
+        df['auditor_labels'] = tu.extract_labels_batch(df["auditor_parse_data"], uqd_extract_labels, use_extracted)
 
     #
     # Returns ['key::value', 'key::value', 'key::value']
@@ -2,6 +2,16 @@ import pandas as pd
 import re
 import math
 import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import json
+import heapq
+import itertools
+
+try:
+    import orjson  # optional: faster parsing of decision_data columns
+except ImportError:
+    orjson = None
 
 
 # --- Logger
@@ -48,6 +58,85 @@ def convert_tricky_date(date_value):
     return None
 
 
+# Formats parsed in bulk: fully validated by pandas and resolved by dateutil to the same day.
+# Each format is only tried on values whose shape (digits replaced by "9") matches.
+_BULK_DATE_FORMATS = [
+    ("%Y-%m-%d",                r"9+-9+-9+"),
+    ("%Y-%m-%d %H:%M:%S",       r"9+-9+-9+ 9+:9+:9+"),
+    ("%Y-%m-%d %H:%M:%S.%f",    r"9+-9+-9+ 9+:9+:9+\.9+"),
+    ("%Y-%m-%dT%H:%M:%S",       r"9+-9+-9+T9+:9+:9+"),
+    ("%Y-%m-%dT%H:%M:%S.%f",    r"9+-9+-9+T9+:9+:9+\.9+"),
+    ("%Y/%m/%d",                r"9+/9+/9+"),
+    ("%m/%d/%Y",                r"9+/9+/9+"),
+    ("%m/%d/%Y %H:%M",          r"9+/9+/9+ 9+:9+"),
+    ("%m/%d/%Y %H:%M:%S",       r"9+/9+/9+ 9+:9+:9+"),
+    ("%m/%d/%Y %I:%M %p",       r"9+/9+/9+ 9+:9+ [AaPp][Mm]"),
+    ("%m/%d/%Y %I:%M:%S %p",    r"9+/9+/9+ 9+:9+:9+ [AaPp][Mm]"),
+]
+
+_DIGIT_SHAPE = str.maketrans("0123456789", "9999999999")
+
+# 5-digit strings are rejected by dateutil and pandas: convert_tricky_date reads them as Excel serials
+_EXCEL_SERIAL_RE = r"^\d{5}(?:\.\d+)?$"
+
+def convert_tricky_dates(values: pd.Series) -> pd.Series:
+    # Column version of convert_tricky_date (same output): bulk formats first, then Excel serials,
+    # per-value convert_tricky_date only on the remainder, once per distinct value
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.dt.strftime("%Y-%m-%d").astype(object).where(values.notna(), None)
+
+    raw = values.to_numpy(dtype=object)
+    out = np.full(len(raw), None, dtype=object)
+
+    is_str = np.fromiter((isinstance(v, str) for v in raw), dtype=bool, count=len(raw))
+    is_na = pd.isna(raw)
+
+    # Strings: resolved on distinct values
+    str_pos = np.flatnonzero(is_str)
+    if len(str_pos):
+        codes, uniques = pd.factorize(raw[str_pos])
+        uniques = pd.Series(uniques, dtype=object)
+        converted = pd.Series(None, index=uniques.index, dtype=object)
+        pending = uniques.str.strip() != ""
+
+        shapes = uniques.str.translate(_DIGIT_SHAPE)
+        for shape in shapes[pending].unique():
+            for fmt, shape_re in _BULK_DATE_FORMATS:
+                if not re.fullmatch(shape_re, shape):
+                    continue
+                candidates = pending & (shapes == shape)
+                if not candidates.any():
+                    break
+                parsed = pd.to_datetime(uniques[candidates], format=fmt, errors="coerce")
+                parsed = parsed[parsed.notna()]
+                converted[parsed.index] = parsed.dt.strftime("%Y-%m-%d")
+                pending[parsed.index] = False
+
+        serials = pending.to_numpy(dtype=bool, copy=True)
+        serials[serials] = uniques[pending].str.fullmatch(_EXCEL_SERIAL_RE).to_numpy(dtype=bool)
+        serials = pd.Series(serials, index=uniques.index)
+        if serials.any():
+            converted[serials] = pd.to_datetime(uniques[serials].astype(float), origin="1899-12-30", unit="D").dt.strftime("%Y-%m-%d")
+            pending &= ~serials
+
+        if pending.any():
+            converted[pending] = uniques[pending].map(convert_tricky_date)
+
+        converted = converted.where(converted.map(type) == str, None).to_numpy(dtype=object)
+        out[str_pos] = converted[codes]
+
+    # Other non-null values (timestamps, numbers): memoized per (type, value)
+    memo = {}
+    for pos in np.flatnonzero(~is_str & ~is_na):
+        v = raw[pos]
+        key = (type(v), v)
+        if key not in memo:
+            memo[key] = convert_tricky_date(v)
+        out[pos] = memo[key]
+
+    return pd.Series(out, index=values.index, name=values.name, dtype=object)
+
+
 # Get content week of job date
 def compute_content_week(dates: pd.Series) -> pd.Series:
     dt = pd.to_datetime(dates, errors="coerce")
@@ -105,6 +194,89 @@ def id_format_check(val):
     return pd.NA
 
 
+_INT_TYPES = [int, np.int8, np.int16, np.int32, np.int64, np.uint8, np.uint16, np.uint32, np.uint64]
+
+def check_id_column(values: pd.Series):
+    # Column version of id_format_check (same values): returns (validated, invalid_mask)
+    #   strings: stripped, decimal digits only (no exponent), over 10 digits
+    #   ints:    kept as-is when over 10 characters
+    #   NA, floats and other types: invalid
+    raw = values.to_numpy(dtype=object)
+    validated = np.full(len(raw), pd.NA, dtype=object)
+
+    inferred = pd.api.types.infer_dtype(raw, skipna=True)
+    if inferred == "string":
+        is_str, is_int = ~pd.isna(raw), np.zeros(len(raw), dtype=bool)
+    elif inferred == "integer":
+        is_str, is_int = np.zeros(len(raw), dtype=bool), ~pd.isna(raw)
+    else:
+        types = pd.Series(raw, dtype=object).map(type)
+        is_str = (types == str).to_numpy(dtype=bool)
+        is_int = types.isin(_INT_TYPES).to_numpy(dtype=bool)
+
+    str_pos = np.flatnonzero(is_str)
+    if len(str_pos):
+        strings = pa.array(raw[str_pos], type=pa.string())
+        stripped = pc.utf8_trim_whitespace(strings)
+        valid = pc.and_(pc.greater(pc.utf8_length(stripped), 10), pc.utf8_is_decimal(stripped))
+        valid = valid.to_numpy(zero_copy_only=False)
+        validated[str_pos[valid]] = raw[str_pos[valid]]
+
+        # Only values with surrounding whitespace need the stripped copy
+        was_stripped = pc.not_equal(pc.utf8_length(stripped), pc.utf8_length(strings)).to_numpy(zero_copy_only=False) & valid
+        if was_stripped.any():
+            validated[str_pos[was_stripped]] = stripped.filter(pa.array(was_stripped)).to_numpy(zero_copy_only=False)
+
+    int_pos = np.flatnonzero(is_int)
+    if len(int_pos):
+        ints = raw[int_pos]
+        # len(str(v)) > 10, sign included
+        valid = ((ints >= 10**10) | (ints <= -10**9)).astype(bool)
+        validated[int_pos[valid]] = ints[valid]
+
+    validated = pd.Series(validated, index=values.index, name=values.name, dtype=object)
+    return validated, validated.isna()
+
+
+def check_id_columns(df, cols):
+    # Validates ID columns in place, returns the mask of rows with at least one invalid ID
+    mask_invalid_id = pd.Series(False, index=df.index)
+    for col in cols:
+        df[col], invalid = check_id_column(df[col])
+        mask_invalid_id |= invalid
+    return mask_invalid_id
+
+
+#####################
+# JSON LABEL EXTRACTION
+#####################
+
+def json_loads(s):
+    # orjson when available; stdlib json for what orjson rejects (NaN, ints over 64 bits, ...)
+    # so that results and decode errors stay the same as json.loads
+    if orjson is not None:
+        try:
+            return orjson.loads(s)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(s)
+
+
+def _copy_labels(labels):
+    if isinstance(labels, list):
+        return list(labels)
+    if isinstance(labels, tuple):
+        return tuple(list(item) if isinstance(item, list) else item for item in labels)
+    return labels
+
+def extract_labels_batch(values, extract_func, *args):
+    # Runs extract_func once per distinct value (decision_data strings repeat heavily across rows).
+    # Rows get their own copy of the extracted lists.
+    codes, uniques = pd.factorize(pd.Series(values, dtype=object), use_na_sentinel=False)
+    extracted = [extract_func(value, *args) for value in uniques]
+    return [_copy_labels(extracted[code]) for code in codes]
+
+
 #####################
 # DATAFRAME FUNCTIONS
 #####################
@@ -143,33 +315,41 @@ def regex_replacer(df, replace_dict):
 
 
 def expand_label_columns(df, label_col, prefix, excluded_list=None):
+    # ['key::value', ...] per row -> one {prefix}_{key} column per key, first value wins
     excluded_set = set(x.strip() for x in (excluded_list or []))
-    tmp = df[[label_col]].copy()
-    tmp[label_col] = tmp[label_col].apply(lambda x: x if isinstance(x, list) else [])
-    exploded = tmp.explode(label_col).reset_index()  # keeing original index
-
-    def split_kv(s):
-        if not isinstance(s, str) or "::" not in s:
-            return pd.Series({f"{prefix}_key": None, f"{prefix}_value": None})
-        k, v = s.split("::", 1)
-        k_clean = k.strip()
-        return pd.Series({f"{prefix}_key": k_clean, f"{prefix}_value": v})
-
-    kv = exploded[label_col].apply(split_kv)
-    exploded = pd.concat([exploded, kv], axis=1)
+    key_col, value_col = f"{prefix}_key", f"{prefix}_value"
+
+    # Explode without building per-element objects
+    labels = [x if isinstance(x, list) else [] for x in df[label_col]]
+    lengths = np.fromiter((len(x) for x in labels), dtype=np.int64, count=len(labels))
+    items = list(itertools.chain.from_iterable(labels))
+    row_index = np.repeat(df.index.to_numpy(), lengths)
+
+    # Non string labels are ignored
+    is_str = np.fromiter((isinstance(x, str) for x in items), dtype=bool, count=len(items))
+    if not is_str.any():
+        return pd.DataFrame(index=df.index)
+    items = pd.Series(items, dtype=object)[is_str]
+    row_index = row_index[is_str]
+
+    # Vectorized split on the first '::' (entries without '::' are dropped)
+    parts = items.str.partition("::")
+    valid = (parts[1] == "::").to_numpy(dtype=bool)
+    kv = pd.DataFrame({
+        "index": row_index[valid],
+        key_col: parts[0][valid].str.strip().to_numpy(dtype=object),
+        value_col: parts[2][valid].to_numpy(dtype=object),
+    })
 
     # scarta le key escluse (senza prefisso: qui è solo 'quality', 'speed', ecc.)
-    exploded = exploded[~exploded[f"{prefix}_key"].isin(excluded_set)]
+    kv = kv[~kv[key_col].isin(excluded_set)]
 
+    # First-wins pivot
     pivoted = (
-        exploded
-        .dropna(subset=[f"{prefix}_key"])
-        .pivot_table(
-            index=exploded["index"],
-            columns=f"{prefix}_key",
-            values=f"{prefix}_value",
-            aggfunc=lambda x: x.iloc[0] if len(x) else None,
-        )
+        kv
+        .drop_duplicates(subset=["index", key_col], keep="first")
+        .set_index(["index", key_col])[value_col]
+        .unstack(key_col)
     )
     pivoted.columns = [f"{prefix}_{col}" for col in pivoted.columns]
     pivoted = pivoted.reindex(df.index, fill_value=None)
@@ -177,6 +357,10 @@ def expand_label_columns(df, label_col, prefix, excluded_list=None):
 
 
 
+# Base columns repeated once per label in to_long, stored as categoricals
+LONG_CATEGORICAL_COLS = ["rater_id", "job_id", "workflow"]
+
+
 def to_long(result: pd.DataFrame,
             base_cols: list[str],
             all_labels: list[str] | None = None) -> pd.DataFrame:
@@ -189,25 +373,39 @@ def to_long(result: pd.DataFrame,
 
     has_auditor = any(c.startswith("a_") for c in result.columns)
     n = len(result)
-    base = result[base_cols].copy()
-
-    frames = []
-    for label in all_labels:
-        r_col = f"r_{label}"
-        r = result[r_col] if r_col in result.columns else pd.Series([""]*n, index=result.index)
-
-        df_lab = base.copy()
-        df_lab["parent_label"] = label
-        df_lab["rater_response"] = r.fillna("")
-
-        if has_auditor:
-            a_col = f"a_{label}"
-            a = result[a_col] if a_col in result.columns else pd.Series([""]*n, index=result.index)
-            df_lab["auditor_response"] = a.fillna("")
-
-        frames.append(df_lab)
-
-    out = pd.concat(frames, ignore_index=True)
+    n_labels = len(all_labels)
+
+    # Base columns are gathered once (label-major order, as the former per-label concat);
+    # repeated ids/workflows are kept as categoricals so only the int codes are tiled.
+    # Columns are built as typed Series and joined without copies: no dtype inference
+    # or block consolidation on the n_labels x rows arrays.
+    index = pd.RangeIndex(n * n_labels)
+    positions = np.tile(np.arange(n), n_labels)
+
+    columns = []
+    for col in base_cols:
+        values = result[col]
+        if col in LONG_CATEGORICAL_COLS:
+            values = values.astype("category")
+        columns.append(pd.Series(values.array.take(positions), index=index, dtype=values.dtype, name=col, copy=False))
+    del positions
+
+    def stacked_responses(prefix):
+        values = np.full(n * n_labels, "", dtype=object)
+        for i, label in enumerate(all_labels):
+            col = f"{prefix}_{label}"
+            if col in result.columns:
+                block = result[col].to_numpy(dtype=object)
+                values[i * n:(i + 1) * n] = np.where(pd.isna(block), "", block)
+        return values
+
+    stacked = {"parent_label": np.repeat(np.array(all_labels, dtype=object), n)}
+    stacked["rater_response"] = stacked_responses("r")
+    if has_auditor:
+        stacked["auditor_response"] = stacked_responses("a")
+    columns += [pd.Series(v, index=index, dtype=object, name=k, copy=False) for k, v in stacked.items()]
+
+    out = pd.concat(columns, axis=1, copy=False)
 
     # opzionale: ordina in modo stabile
     #sort_cols = base_cols + ["parent_label"]
@@ -354,34 +552,60 @@ def generate_rubric(
     # --------------------
     # helpers: read rubric as list of (extended_entry_name, factor) for a row
     # --------------------
-    def row_items(r):
-        # WIDE format
-        if rubric_entries_cols is not None:
-            items = []
-            for col in rubric_entries_cols:
-                val = r[col]
-
-                # skip None / NaN
-                if val is None:
-                    continue
-                if isinstance(val, float) and val != val:
-                    continue
+    def wide_items(values):
+        items = []
+        for col, val in zip(rubric_entries_cols, values):
+            # skip None / NaN
+            if val is None:
+                continue
+            if isinstance(val, float) and val != val:
+                continue
 
-                try:
-                    f = float(val)
-                except Exception:
-                    continue
+            try:
+                f = float(val)
+            except Exception:
+                continue
 
-                if f == 0:
-                    continue
+            if f == 0:
+                continue
 
-                items.append((str(col).strip(), f))
-            return items
+            items.append((str(col).strip(), f))
+        return items
 
-        # DICT format
-        rub = r[rubric_column]
+    def dict_items(rub):
         return [(str(k).strip(), float(v)) for k, v in rub.items()]
 
+    # --------------------
+    # Deduplicate rows into unique (items, deduction) signatures.
+    # Each signature keeps the sorted positions of its rows, so that the row order
+    # of the former full-table sweeps can be replayed on signatures only.
+    # --------------------
+    deductions = df["deduction"].to_numpy(dtype=float)
+
+    if rubric_entries_cols is not None:
+        # identical raw rows are parsed once
+        group_ids = df.groupby(list(rubric_entries_cols) + ["deduction"], sort=False, dropna=False).ngroup().to_numpy()
+        _, first_rows = np.unique(group_ids, return_index=True)
+        wide_values = df[list(rubric_entries_cols)].to_numpy(dtype=object)
+        group_items = {group_ids[i]: wide_items(wide_values[i]) for i in np.sort(first_rows)}
+        row_items = [group_items[g] for g in group_ids]
+    else:
+        row_items = [dict_items(rub) for rub in df[rubric_column]]
+
+    signatures = []      # sig id -> (items, deduction), in first occurrence order
+    sig_ids = {}
+    row_sig = np.empty(len(row_items), dtype=np.int64)
+    for pos, (items, d) in enumerate(zip(row_items, deductions)):
+        key = (tuple(items), d)
+        sid = sig_ids.get(key)
+        if sid is None:
+            sid = sig_ids[key] = len(signatures)
+            signatures.append((items, d))
+        row_sig[pos] = sid
+
+    order = np.argsort(row_sig, kind="stable")
+    sig_positions = np.split(order, np.cumsum(np.bincount(row_sig, minlength=len(signatures)))[:-1])
+
     # helper: set penalty with priority to seeds
     def set_penalty(entry_ext, value, source_label):
         # never overwrite seeded
@@ -408,8 +632,7 @@ def generate_rubric(
     # --------------------
     # STEP 1: bootstrap from single-entry rows
     # --------------------
-    for _, r in df.iterrows():
-        items = row_items(r)
+    for items, d in signatures:
         if len(items) != 1:
             continue
 
@@ -417,38 +640,58 @@ def generate_rubric(
         if factor == 0:
             continue
 
-        value = float(r["deduction"]) / float(factor)
+        value = float(d) / float(factor)
         set_penalty(entry_ext, value, source_label="single-entry bootstrap")
 
     # --------------------
-    # STEP 2: iterative propagation (rows with exactly 1 unknown)
+    # STEP 2: propagation (rows with exactly 1 unknown)
+    # Same outcome as sweeping all rows until nothing changes: a signature whose
+    # unknown count drops to 1 is visited at its next row position in the current
+    # sweep, or at its first one in the following sweep (heap keyed by sweep, row).
     # --------------------
-    changed = True
-    while changed:
-        changed = False
-
-        for _, r in df.iterrows():
-            items = row_items(r)
-            if not items:
-                continue
-
-            d = float(r["deduction"])
-            known_sum = 0.0
-            unknown = []
+    entry_sigs = {}      # entry -> signatures using it (with multiplicity)
+    unknown_count = []
+    for sid, (items, _) in enumerate(signatures):
+        count = 0
+        for entry_ext, _ in items:
+            if entry_ext not in penalties:
+                entry_sigs.setdefault(entry_ext, []).append(sid)
+                count += 1
+        unknown_count.append(count)
+
+    ready = [(0, int(sig_positions[sid][0]), sid) for sid, count in enumerate(unknown_count) if count == 1]
+    heapq.heapify(ready)
+
+    while ready:
+        sweep, pos, sid = heapq.heappop(ready)
+        items, d = signatures[sid]
+
+        known_sum = 0.0
+        unknown = []
+        for entry_ext, factor in items:
+            if entry_ext in penalties:
+                known_sum += float(factor) * float(penalties[entry_ext])
+            else:
+                unknown.append((entry_ext, float(factor)))
+
+        if len(unknown) != 1:
+            continue
+        entry_u, factor_u = unknown[0]
+        if factor_u == 0:
+            continue
+        value = (float(d) - known_sum) / factor_u
+        if not set_penalty(entry_u, value, source_label="propagation"):
+            continue
 
-            for entry_ext, factor in items:
-                if entry_ext in penalties:
-                    known_sum += float(factor) * float(penalties[entry_ext])
+        for other in entry_sigs.pop(entry_u, []):
+            unknown_count[other] -= 1
+            if unknown_count[other] == 1:
+                positions = sig_positions[other]
+                k = np.searchsorted(positions, pos, side="right")
+                if k < len(positions):
+                    heapq.heappush(ready, (sweep, int(positions[k]), other))
                 else:
-                    unknown.append((entry_ext, float(factor)))
-
-            if len(unknown) == 1:
-                entry_u, factor_u = unknown[0]
-                if factor_u == 0:
-                    continue
-                value = (d - known_sum) / factor_u
-                if set_penalty(entry_u, value, source_label="propagation"):
-                    changed = True
+                    heapq.heappush(ready, (sweep + 1, int(positions[0]), other))
 
     # --------------------
     # STEP 3: build final rubric output (provided has priority)
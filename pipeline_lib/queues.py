@@ -1,63 +1,353 @@
 import os
 import time
+import sqlite3
+import json
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import ast
+import uuid
+import socket
+import threading
+from contextlib import contextmanager
 from datetime import datetime, timezone
 
+# --- Logger
+import logging
+logger = logging.getLogger(__name__)
+
+
+try:
+    import fcntl
+except ImportError:  # Windows: O_EXCL lock files only
+    fcntl = None
+
+
+# Missed heartbeats before an O_EXCL lock whose holder cannot be checked is considered stale
+STALE_HEARTBEATS = 12
+
+
+def _pid_alive(pid):
+    # True / False for a process of this host, None when it cannot be told
+    if os.name == "posix":
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+        except OSError:
+            return None
+        return True
+
+    # Windows: os.kill(pid, 0) would terminate the process, query it instead
+    try:
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, int(pid))  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            error = kernel32.GetLastError()
+            if error == 87:     # ERROR_INVALID_PARAMETER: no such process
+                return False
+            return True if error == 5 else None     # ERROR_ACCESS_DENIED: exists
+        try:
+            exit_code = ctypes.c_ulong()
+            if not kernel32.GetExitCodeProcess(handle, ctypes.byref(exit_code)):
+                return None
+            return exit_code.value == 259   # STILL_ACTIVE
+        finally:
+            kernel32.CloseHandle(handle)
+    except Exception:
+        return None
+
+
 class FileLock:
-    def __init__(self, path):
+    # Inter-process lock on <path>.lock
+    #   fcntl (POSIX): flock() shared/exclusive, released by the kernel if the holder dies
+    #   fallback:      O_EXCL lock file holding host + PID + token, heartbeat on its mtime.
+    #                  A lock is broken when its holder process is gone (same host), or when the
+    #                  holder cannot be checked and the heartbeat is stale_after old (default:
+    #                  STALE_HEARTBEATS missed heartbeats). The holder checks its token before release.
+    #                  No shared mode: readers take the exclusive lock.
+    def __init__(self, path, stale_after=None, heartbeat_interval=10):
         self.lock_path = f"{path}.lock"
+        self.heartbeat_interval = heartbeat_interval
+        self.stale_after = max(stale_after or 0, heartbeat_interval * STALE_HEARTBEATS)
+        self._local = threading.local()
+        self._live_warned_at = 0.0
+        self._metrics_lock = threading.Lock()
+        self.metrics = {
+            "acquired": 0,
+            "shared": 0,
+            "exclusive": 0,
+            "wait_total": 0.0,
+            "wait_max": 0.0,
+            "timeouts": 0,
+            "stale_broken": 0
+        }
+
+    def _holder_info(self, token=None):
+        return json.dumps({"pid": os.getpid(), "host": socket.gethostname(), "token": token, "acquired": time.time()})
+
+    def _record(self, key, value=1):
+        with self._metrics_lock:
+            self.metrics[key] += value
+
+    def get_metrics(self):
+        with self._metrics_lock:
+            metrics = dict(self.metrics)
+        metrics["wait_avg"] = metrics["wait_total"] / metrics["acquired"] if metrics["acquired"] else 0.0
+        return metrics
+
+    # --- fcntl
+    def _try_flock(self, fd, shared):
+        try:
+            fcntl.flock(fd, (fcntl.LOCK_SH if shared else fcntl.LOCK_EX) | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        if not shared:
+            # Holder info for diagnostics only: the lock is the flock, not the file content
+            os.ftruncate(fd, 0)
+            os.write(fd, self._holder_info().encode("utf-8"))
+        return True
+
+    # --- O_EXCL fallback
+    def _read_holder(self, path):
+        try:
+            with open(path, "r") as f:
+                return json.loads(f.read() or "{}")
+        except (OSError, ValueError):
+            return {}  # legacy 'locked' content or unreadable: rely on heartbeat age only
 
-    def acquire(self, timeout=30):
-        start_time = time.time()
-        while os.path.exists(self.lock_path):
-            if time.time() - start_time > timeout:
+    def _is_stale(self, path):
+        try:
+            heartbeat_age = time.time() - os.path.getmtime(path)
+        except OSError:
+            return False
+
+        # Holder on this host: its process decides, however late its heartbeat is
+        holder = self._read_holder(path)
+        if holder.get("host") == socket.gethostname() and holder.get("pid"):
+            alive = _pid_alive(holder["pid"])
+            if alive is not None:
+                if alive and heartbeat_age > self.stale_after and time.time() - self._live_warned_at > self.stale_after:
+                    self._live_warned_at = time.time()
+                    logger.warning(f"Lock {self.lock_path} held by live PID {holder['pid']} without heartbeat for {heartbeat_age:.0f}s: not broken")
+                return not alive
+
+        # Other host or unknown holder: heartbeat age only
+        return heartbeat_age > self.stale_after
+
+    def _break_stale(self):
+        # Rename first so that only one process breaks a given stale lock
+        stale_path = f"{self.lock_path}.stale.{os.getpid()}.{threading.get_ident()}"
+        try:
+            os.rename(self.lock_path, stale_path)
+        except OSError:
+            return
+        if not self._is_stale(stale_path) and not os.path.exists(self.lock_path):
+            os.rename(stale_path, self.lock_path)  # lost a race with a fresh holder: put its lock back
+            return
+        holder = self._read_holder(stale_path)
+        os.remove(stale_path)
+        self._record("stale_broken")
+        logger.warning(f"Broke stale lock: {self.lock_path} (holder: {holder})")
+
+    def _owns_lock(self, path, token):
+        return self._read_holder(path).get("token") == token
+
+    def _heartbeat(self, stop, token):
+        while not stop.wait(self.heartbeat_interval):
+            if not self._owns_lock(self.lock_path, token):
+                logger.error(f"Lock {self.lock_path} no longer owned by this holder: heartbeat stopped")
+                return
+            try:
+                os.utime(self.lock_path, None)
+            except OSError:
+                return
+
+    def _try_create(self):
+        try:
+            fd = os.open(self.lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            if self._is_stale(self.lock_path):
+                self._break_stale()
+            return False
+        token = uuid.uuid4().hex
+        try:
+            os.write(fd, self._holder_info(token).encode("utf-8"))
+        finally:
+            os.close(fd)
+
+        stop = threading.Event()
+        thread = threading.Thread(target=self._heartbeat, args=(stop, token), daemon=True)
+        thread.start()
+        self._local.heartbeat = (stop, thread, token)
+        return True
+
+    def acquire(self, timeout=30, shared=False):
+        shared = shared and fcntl is not None
+        start_time = time.monotonic()
+        delay = 0.001
+
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644) if fcntl is not None else None
+        while not (self._try_flock(fd, shared) if fd is not None else self._try_create()):
+            if time.monotonic() - start_time > timeout:
+                if fd is not None:
+                    os.close(fd)
+                self._record("timeouts")
                 raise TimeoutError(f"Timeout while waiting for lock on {self.lock_path}")
-            time.sleep(0.1)
-        with open(self.lock_path, 'w') as f:
-            f.write('locked')
+            time.sleep(delay)
+            delay = min(delay * 2, 0.1)
+        self._local.fd = fd
+
+        wait = time.monotonic() - start_time
+        with self._metrics_lock:
+            self.metrics["acquired"] += 1
+            self.metrics["shared" if shared else "exclusive"] += 1
+            self.metrics["wait_total"] += wait
+            self.metrics["wait_max"] = max(self.metrics["wait_max"], wait)
+        if wait > 1:
+            logger.info(f"Waited {wait:.1f}s for {'shared' if shared else 'exclusive'} lock on {self.lock_path}")
 
     def release(self):
-        if os.path.exists(self.lock_path):
-            os.remove(self.lock_path)
+        fd = getattr(self._local, "fd", None)
+        if fd is not None:
+            self._local.fd = None
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+            return
+
+        heartbeat = getattr(self._local, "heartbeat", None)
+        if heartbeat is not None:
+            self._local.heartbeat = None
+            stop, thread, token = heartbeat
+            stop.set()
+            thread.join()
+
+            # Removed only if it is still this holder's lock (a broken lock may belong to another process now)
+            if not self._owns_lock(self.lock_path, token):
+                logger.error(f"Lock {self.lock_path} was broken or taken over while held: left to its current holder")
+                return
+            released_path = f"{self.lock_path}.released.{os.getpid()}.{threading.get_ident()}"
+            try:
+                os.rename(self.lock_path, released_path)
+            except OSError:
+                return
+            if not self._owns_lock(released_path, token):
+                # taken over between the check and the rename: put it back
+                if not os.path.exists(self.lock_path):
+                    os.rename(released_path, self.lock_path)
+                return
+            os.remove(released_path)
+
+
+# Nested struct used for the file_list / valid_files_list snapshot columns
+SNAPSHOT_FILE_STRUCT = pa.struct([
+    ("filename", pa.string()),
+    ("hash", pa.string()),
+    ("naming_filter", pa.string()),
+    ("dataset_format", pa.string()),
+])
+
+SNAPSHOT_SCHEMA = pa.schema([
+    ("timestamp", pa.string()),
+    ("snapshot_id", pa.int64()),
+    ("project_id", pa.string()),
+    ("project_name", pa.string()),
+    ("data_week", pa.date32()),
+    ("folder_hash", pa.string()),
+    ("has_any_data", pa.bool_()),
+    ("has_weekly_data", pa.bool_()),
+    ("file_number", pa.int64()),
+    ("file_list", pa.list_(SNAPSHOT_FILE_STRUCT)),
+    ("valid_files_number", pa.int64()),
+    ("valid_files_list", pa.list_(SNAPSHOT_FILE_STRUCT)),
+])
 
 
 class SnapshotManager:
-    def __init__(self, filepath):
-        self.filepath = filepath
-        self.lock = FileLock(filepath)
-        self.columns = [
-            'timestamp', 
-            'snapshot_id', 
-            'project_id', 
-            'project_name', 
-            'data_week', 
-            'folder_hash', 
-            'has_any_data', 
-            'has_weekly_data', 
-            'file_number', 
-            'file_list', 
-            'valid_files_number', 
-            'valid_files_list'
-        ]
+    # Store layout:
+    #   <store_path>/manifest.json                          {"last_snapshot_id": n, ...}
+    #   <store_path>/snapshot_id=<n>/part-<k>.parquet       one partition per snapshot
+    def __init__(self, store_path, legacy_csv_path=None):
+        self.store_path = store_path
+        self.manifest_path = os.path.join(store_path, "manifest.json")
+        self.lock = FileLock(store_path)
+        self.columns = SNAPSHOT_SCHEMA.names
+        self.list_columns = ['file_list', 'valid_files_list']
+
+        os.makedirs(self.store_path, exist_ok=True)
+        if legacy_csv_path and not os.path.exists(self.manifest_path):
+            self.migrate_from_csv(legacy_csv_path)
     
     def _generate_timestamp(self):
         return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+    def _partition_path(self, snapshot_id):
+        return os.path.join(self.store_path, f"snapshot_id={int(snapshot_id)}")
+
+    def _read_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return {}
+        with open(self.manifest_path, "r") as f:
+            return json.load(f)
+
+    def _write_manifest(self, last_id):
+        manifest = {
+            "last_snapshot_id": int(last_id),
+            "updated": self._generate_timestamp()
+        }
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, self.manifest_path)
     
     def _get_last_id(self):
-        if not os.path.exists(self.filepath):
-            return None
-        
-        df = pd.read_csv(self.filepath, usecols=lambda c: c == "snapshot_id" or False)
-        if "snapshot_id" not in df.columns or df.empty:
-            return None
-        
-        max_id = pd.to_numeric(df["snapshot_id"], errors="coerce").max()
-        return int(max_id) if pd.notna(max_id) else None
+        last_id = self._read_manifest().get("last_snapshot_id")
+        return int(last_id) if last_id is not None else None
 
     def _generate_id(self):
         last_id = self._get_last_id()
         return last_id + 1 if last_id is not None else 1
+
+    def _parse_file_list(self, val):
+        if isinstance(val, list):
+            return val
+        if isinstance(val, str) and val.strip():
+            try:
+                return ast.literal_eval(val)
+            except Exception as e:
+                logger.error(f"Failed to parse snapshot file list: {e} -> {val}")
+        return []
+
+    def _to_table(self, df, snapshot_id, timestamp):
+        df = df.copy()
+        for col in self.columns:
+            if col not in df.columns:
+                df[col] = None
+
+        df["timestamp"] = timestamp
+        df["snapshot_id"] = int(snapshot_id)
+        df["data_week"] = pd.to_datetime(df["data_week"], errors="coerce").dt.date
+        for col in ["has_any_data", "has_weekly_data"]:
+            df[col] = df[col].map(lambda v: str(v).strip().lower() == "true")
+        for col in ["file_number", "valid_files_number"]:
+            df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0).astype("int64")
+        for col in self.list_columns:
+            df[col] = df[col].map(self._parse_file_list)
+
+        return pa.Table.from_pandas(df[self.columns], schema=SNAPSHOT_SCHEMA, preserve_index=False)
+
+    def _write_partition(self, table, snapshot_id):
+        partition_path = self._partition_path(snapshot_id)
+        os.makedirs(partition_path, exist_ok=True)
+
+        part_no = len([f for f in os.listdir(partition_path) if f.endswith(".parquet")])
+        part_path = os.path.join(partition_path, f"part-{part_no}.parquet")
+        tmp_path = os.path.join(partition_path, f".part-{part_no}.parquet.tmp") # dot-prefixed: ignored by dataset readers
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, part_path)
         
     def generate_snapshot_id(self):
         self.lock.acquire()
@@ -69,68 +359,44 @@ class SnapshotManager:
     def push(self, snapshot_id, entry_dict):
         self.lock.acquire()
         try:
-            file_exists = os.path.exists(self.filepath)
-
-            row = {col: "" for col in self.columns}
-            row.update(entry_dict)
-            row["snapshot_id"] = snapshot_id
-            row["timestamp"] = self._generate_timestamp()
+            table = self._to_table(pd.DataFrame([entry_dict]), snapshot_id, self._generate_timestamp())
+            self._write_partition(table, snapshot_id)
 
-            df = pd.DataFrame([row], columns=self.columns)
-            df = df.astype(str)
-
-            with open(self.filepath, 'a', newline='') as f:
-                df.to_csv(f, header=not file_exists, index=False)
+            last_id = self._get_last_id()
+            if last_id is None or int(snapshot_id) > last_id:
+                self._write_manifest(snapshot_id)
         finally:
             self.lock.release()
     
     def add_snapshot(self, df):
         self.lock.acquire()
         try:
-            file_exists = os.path.exists(self.filepath)
-
             snapshot_id = self._generate_id()
 
-            df = df.copy()
-            for col in self.columns:
-                if col not in df.columns:
-                    df[col] = ""
-
-            df["timestamp"] = self._generate_timestamp()
-            df["snapshot_id"] = snapshot_id
-
-            df = df[self.columns]
-            df = df.astype(str)
-
-            with open(self.filepath, 'a', newline='') as f:
-                df.to_csv(f, header=not file_exists, index=False)
+            table = self._to_table(df, snapshot_id, self._generate_timestamp())
+            self._write_partition(table, snapshot_id)
+            self._write_manifest(snapshot_id)
 
+            return snapshot_id
         finally:
             self.lock.release()
     
     def get_snapshot(self, snapshot_id):
-        self.lock.acquire()
+        self.lock.acquire(shared=True)
         try:
-            if not os.path.exists(self.filepath):
+            if snapshot_id is None:
                 return pd.DataFrame(columns=self.columns)
-            df = pd.read_csv(self.filepath, low_memory=False)
-            if "snapshot_id" not in df.columns:
-                return pd.DataFrame(columns=df.columns)
-            df["snapshot_id"] = pd.to_numeric(df["snapshot_id"], errors="coerce")
-            return df[df["snapshot_id"] == snapshot_id].copy()
-        finally:
-            self.lock.release()
 
-    def get_snapshot_item(self, item):
-        self.lock.acquire()
-        try:
-            if not os.path.exists(self.filepath):
+            partition_path = self._partition_path(snapshot_id)
+            if not os.path.isdir(partition_path):
                 return pd.DataFrame(columns=self.columns)
-            df = pd.read_csv(self.filepath)
-            if "snapshot_id" not in df.columns:
-                return pd.DataFrame(columns=df.columns)
-            df["snapshot_id"] = pd.to_numeric(df["snapshot_id"], errors="coerce")
-            return df[df["snapshot_id"] == snapshot_id].copy()
+
+            table = pq.read_table(partition_path, schema=SNAPSHOT_SCHEMA)
+            df = table.drop_columns(self.list_columns).to_pandas(date_as_object=False)
+            # Nested columns come back as plain lists of dicts (not numpy arrays)
+            for col in self.list_columns:
+                df[col] = table.column(col).to_pylist()
+            return df[self.columns]
         finally:
             self.lock.release()
 
@@ -143,13 +409,44 @@ class SnapshotManager:
             return None
         return last_iter - 1
 
+    def migrate_from_csv(self, csv_path):
+        if not os.path.exists(csv_path):
+            return 0
+
+        self.lock.acquire()
+        try:
+            if os.path.exists(self.manifest_path):
+                return 0
+
+            df = pd.read_csv(csv_path, dtype=str, keep_default_na=False, low_memory=False)
+            df["snapshot_id"] = pd.to_numeric(df["snapshot_id"], errors="coerce")
+            df = df[df["snapshot_id"].notna()]
+            if df.empty:
+                return 0
+
+            for snapshot_id, snapshot_df in df.groupby("snapshot_id", sort=True):
+                timestamp = snapshot_df["timestamp"].iloc[0] if "timestamp" in snapshot_df.columns else self._generate_timestamp()
+                table = self._to_table(snapshot_df, snapshot_id, timestamp)
+                self._write_partition(table, snapshot_id)
+
+            last_id = int(df["snapshot_id"].max())
+            self._write_manifest(last_id)
+        finally:
+            self.lock.release()
+
+        logger.info(f"Snapshot store migrated from CSV: {csv_path} ({last_id} snapshots)")
+        return last_id
+
 
 
 
 class TransformationQueueManager:
-    def __init__(self, filepath):
+    def __init__(self, filepath, legacy_csv_path=None, lease_seconds=600, owner_id=None):
         self.filepath = filepath
-        self.lock = FileLock(filepath)
+        self.legacy_csv_path = legacy_csv_path
+        self.lease_seconds = lease_seconds
+        # Claim owner: one per pipeline instance
+        self.owner_id = owner_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
         self.columns = [
             'item_id',
             'timestamp',    
@@ -159,163 +456,366 @@ class TransformationQueueManager:
             'data_week',
             'filename',
             'transform_status',
+            'transform_info',
             'output_filenames',
             'content_weeks',
             'olap_sync'
         ]
+        self._init_db()
+        if legacy_csv_path:
+            self.migrate_from_csv(legacy_csv_path)
+
+    # --- SQLite helpers
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.filepath, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _transaction(self):
+        # BEGIN IMMEDIATE takes the write lock up front: read-then-update sequences
+        # (id allocation, claiming) cannot interleave with another writer
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def _init_db(self):
+        folder = os.path.dirname(self.filepath)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS transformation_queue (
+                    item_id             INTEGER PRIMARY KEY,
+                    timestamp           TEXT NOT NULL DEFAULT '',
+                    snapshot_id         TEXT NOT NULL DEFAULT '',
+                    project_id          TEXT NOT NULL DEFAULT '',
+                    project_name        TEXT NOT NULL DEFAULT '',
+                    data_week           TEXT NOT NULL DEFAULT '',
+                    filename            TEXT NOT NULL DEFAULT '',
+                    transform_status    TEXT NOT NULL DEFAULT '',
+                    transform_info      TEXT NOT NULL DEFAULT '',
+                    output_filenames    TEXT NOT NULL DEFAULT '',
+                    content_weeks       TEXT NOT NULL DEFAULT '',
+                    olap_sync           TEXT NOT NULL DEFAULT ''
+                )
+            """)
+            # Claim metadata (not part of the exported queue columns)
+            existing = {row["name"] for row in conn.execute("PRAGMA table_info(transformation_queue)")}
+            if "lease_owner" not in existing:
+                conn.execute("ALTER TABLE transformation_queue ADD COLUMN lease_owner TEXT NOT NULL DEFAULT ''")
+            if "lease_expires" not in existing:
+                conn.execute("ALTER TABLE transformation_queue ADD COLUMN lease_expires REAL NOT NULL DEFAULT 0")
+            # item_id is the INTEGER PRIMARY KEY (rowid), hence already indexed
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_tq_transform_status ON transformation_queue (transform_status)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_tq_olap_sync ON transformation_queue (olap_sync)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS queue_meta (
+                    key     TEXT PRIMARY KEY,
+                    value   TEXT NOT NULL
+                )
+            """)
+
+    def _row_to_dict(self, row):
+        # Same shape as the legacy CSV reader (dtype=str): every value is a string
+        record = {col: row[col] for col in self.columns}
+        record["item_id"] = str(record["item_id"])
+        return record
+
+    def _status_condition(self, status):
+        if status in {"enqueued", "processing", "failed"}:
+            return "transform_status = ?", (status,)
+        elif status == "olap_sync_ready":
+            return "transform_status = 'transformed' AND olap_sync = ''", ()
+        elif status == "expired":
+            # Claimed for transformation, but the owner stopped renewing its lease
+            return "transform_status = 'processing' AND lease_expires < ?", (time.time(),)
+        else:
+            raise ValueError(f"Unsupported status: {status}")
+
+    def _claim_condition(self, mode, now):
+        # Items that can be claimed: unclaimed or with an expired lease
+        if mode in {"enqueued", "transform"}:
+            return "(transform_status = 'enqueued' OR (transform_status = 'processing' AND lease_expires < ?))", (now,)
+        condition, params = self._status_condition(mode)
+        return f"{condition} AND lease_expires < ?", (*params, now)
 
-    def _get_last_id(self):
-        if not os.path.exists(self.filepath):
-            return None
-
-        df = pd.read_csv(self.filepath, usecols=lambda c: c == "item_id" or False)
-        if "item_id" not in df.columns or df.empty:
-            return None
-
-        max_id = pd.to_numeric(df["item_id"], errors="coerce").max()
-        return int(max_id) if pd.notna(max_id) else None
-
-    def _generate_id(self):
-        last_id = self._get_last_id()
-        return last_id + 1 if last_id is not None else 1
-    
     def _generate_timestamp(self):
         return datetime.now(timezone.utc).isoformat(timespec="seconds")
-    
-    def push(self, record_dict):
-        self.lock.acquire()
-        try:
-            file_exists = os.path.exists(self.filepath)
-
-            for col in self.columns:
-                if col not in record_dict:
-                    record_dict[col] = ""
-
-            record = {
-                "item_id": self._generate_id(),
-                "timestamp": self._generate_timestamp(),
-                "snapshot_id": str(record_dict["snapshot_id"]),
-                "project_id": str(record_dict["project_id"]),
-                "project_name": str(record_dict["project_name"]),
-                "data_week": str(record_dict["data_week"]),
-                "filename": str(record_dict["filename"]),
-                "transform_status": "enqueued",
-                "transform_info": "",
-                "output_filenames": "",
-                "content_weeks": "",
-                "olap_sync": ""
-                #**{col: str(record_dict[col]) for col in self.required_columns},
-            }
-
-            df = pd.DataFrame([record])
-            with open(self.filepath, "a", newline="") as f:
-                df.to_csv(f, header=not file_exists, index=False)
-            
-            return record["item_id"]
-        finally:
-            self.lock.release()
 
-    def append_df(self, df):
-        for _, row in df.iterrows():
-            self.push(row.to_dict())
+    # --- Legacy CSV interop
+    def migrate_from_csv(self, csv_path):
+        if not os.path.exists(csv_path):
+            return 0
 
-    def count(self, status="enqueued"):
-        self.lock.acquire()
-        try:
-            if not os.path.exists(self.filepath):
+        with self._transaction() as conn:
+            migrated = conn.execute("SELECT value FROM queue_meta WHERE key = 'migrated_from_csv'").fetchone()
+            if migrated is not None:
                 return 0
-            df = pd.read_csv(self.filepath, dtype=str)
-
-            if status in {"enqueued", "processing", "failed"}:
-                return (df["transform_status"] == status).sum()
-            
-            elif status == "olap_sync_ready":
-                transformed_series = df["transform_status"].fillna("").str.strip().str.lower()
-                olap_sync_series = df["olap_sync"].fillna("").str.strip().str.lower()
-                condition = (transformed_series == "transformed") & (olap_sync_series == "")
-                return condition.sum()
-            
-            else:
-                raise ValueError(f"Unsupported status: {status}")
-        finally:
-            self.lock.release()
-    
-    def pop(self, mode="enqueued"):
-        self.lock.acquire()
-        try:
-            if not os.path.exists(self.filepath):
-                return None
-
-            df = pd.read_csv(self.filepath, dtype=str)
 
-            if mode == "enqueued":
-                queue = df[df["transform_status"] == "enqueued"]
+            df = pd.read_csv(csv_path, dtype=str, keep_default_na=False)
+            for col in self.columns:
+                if col not in df.columns:
+                    df[col] = ""
+            df = df[self.columns].copy()
+
+            # Same normalization the CSV queue applied when reading statuses
+            df["transform_status"] = df["transform_status"].str.strip().str.lower()
+            df["olap_sync"] = df["olap_sync"].str.strip().str.lower()
+            df["item_id"] = pd.to_numeric(df["item_id"], errors="coerce")
+            df = df[df["item_id"].notna()]
+            df["item_id"] = df["item_id"].astype(int)
+
+            placeholders = ", ".join("?" for _ in self.columns)
+            conn.executemany(
+                f"INSERT OR IGNORE INTO transformation_queue ({', '.join(self.columns)}) VALUES ({placeholders})",
+                df.itertuples(index=False, name=None)
+            )
+            conn.execute(
+                "INSERT INTO queue_meta (key, value) VALUES ('migrated_from_csv', ?)",
+                (self._generate_timestamp(),)
+            )
+
+        logger.info(f"Transformation queue migrated from CSV: {csv_path} ({len(df)} items)")
+        return len(df)
+
+    def export_csv(self, csv_path=None):
+        csv_path = csv_path or self.legacy_csv_path
+        if not csv_path:
+            raise ValueError("No CSV path provided for queue export.")
+
+        with self._connect() as conn:
+            df = pd.read_sql_query(
+                f"SELECT {', '.join(self.columns)} FROM transformation_queue ORDER BY item_id",
+                conn
+            )
+        df.to_csv(csv_path, index=False)
+        logger.info(f"Transformation queue exported to CSV: {csv_path} ({len(df)} items)")
+        return csv_path
+
+    # --- Queue API
+    def _build_record(self, record_dict, timestamp):
+        return {
+            "timestamp": timestamp,
+            "snapshot_id": str(record_dict.get("snapshot_id", "")),
+            "project_id": str(record_dict.get("project_id", "")),
+            "project_name": str(record_dict.get("project_name", "")),
+            "data_week": str(record_dict.get("data_week", "")),
+            "filename": str(record_dict.get("filename", "")),
+            "transform_status": "enqueued",
+            "transform_info": "",
+            "output_filenames": "",
+            "content_weeks": "",
+            "olap_sync": ""
+        }
 
-            elif mode == "olap_sync_ready":
-                transformed_series = df["transform_status"].fillna("").str.strip().str.lower()
-                olap_sync_series = df["olap_sync"].fillna("").str.strip().str.lower()
-                condition = (transformed_series == "transformed") & (olap_sync_series == "")
-                queue = df[condition]
+    def push(self, record_dict):
+        return self.push_many([record_dict])[0]
+
+    def push_many(self, records):
+        # Allocates a contiguous item_id range and inserts all records in one transaction
+        timestamp = self._generate_timestamp()
+        rows = [self._build_record(record_dict, timestamp) for record_dict in records]
+        if not rows:
+            return []
+
+        columns = ["item_id"] + list(rows[0])
+        with self._transaction() as conn:
+            last_id = conn.execute("SELECT COALESCE(MAX(item_id), 0) FROM transformation_queue").fetchone()[0]
+            item_ids = list(range(last_id + 1, last_id + 1 + len(rows)))
+            conn.executemany(
+                f"INSERT INTO transformation_queue ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})",
+                [(item_id, *row.values()) for item_id, row in zip(item_ids, rows)]
+            )
+
+        logger.debug(f"Transformation queue: enqueued {len(item_ids)} items ({item_ids[0]}-{item_ids[-1]})")
+        return item_ids
 
-            else:
-                raise ValueError(f"Unsupported mode: {mode}")
+    def append_df(self, df):
+        return self.push_many(df.to_dict(orient="records"))
 
-            if queue.empty:
+    def count(self, status="enqueued"):
+        condition, params = self._status_condition(status)
+        with self._connect() as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM transformation_queue WHERE {condition}", params).fetchone()[0]
+    
+    def pop(self, mode="enqueued", lease_seconds=None):
+        # Claims the oldest available item with a lease owned by this instance.
+        # Transformation claims also move the item to 'processing'.
+        now = time.time()
+        lease_expires = now + (lease_seconds or self.lease_seconds)
+        condition, params = self._claim_condition(mode, now)
+
+        with self._transaction() as conn:
+            row = conn.execute(
+                f"SELECT * FROM transformation_queue WHERE {condition} ORDER BY item_id LIMIT 1",
+                params
+            ).fetchone()
+            if row is None:
                 return None
-            
-            queue = queue.copy()
-            queue["item_id_int"] = queue["item_id"].astype(int)
-            oldest = queue.sort_values("item_id_int").iloc[0]
-            record_id = oldest["item_id"]
-
-            if mode == "transform":
-                df.loc[df["item_id"] == record_id, "transform_status"] = "processing"
-
-            df.to_csv(self.filepath, index=False)
-
-            return df[df["item_id"] == record_id].iloc[0].to_dict()
 
+            if row["lease_owner"] and row["lease_expires"]:
+                logger.warning(f"Reclaiming expired lease on Item ID {row['item_id']} (previous owner: {row['lease_owner']})")
+
+            assignments = "lease_owner = ?, lease_expires = ?"
+            if mode in {"enqueued", "transform"}:
+                assignments += ", transform_status = 'processing'"
+            conn.execute(
+                f"UPDATE transformation_queue SET {assignments} WHERE item_id = ?",
+                (self.owner_id, lease_expires, row["item_id"])
+            )
+            row = conn.execute("SELECT * FROM transformation_queue WHERE item_id = ?", (row["item_id"],)).fetchone()
+
+            return self._row_to_dict(row)
+
+    def pop_group(self, mode="olap_sync_ready", group_by=("project_id", "data_week"), lease_seconds=None):
+        # Claims the oldest available item together with every other available item
+        # sharing its group_by values (e.g. all files of one project-week)
+        now = time.time()
+        lease_expires = now + (lease_seconds or self.lease_seconds)
+        condition, params = self._claim_condition(mode, now)
+        for key in group_by:
+            if key not in self.columns:
+                raise ValueError(f"Column '{key}' not found in the table.")
+
+        with self._transaction() as conn:
+            first = conn.execute(
+                f"SELECT * FROM transformation_queue WHERE {condition} ORDER BY item_id LIMIT 1",
+                params
+            ).fetchone()
+            if first is None:
+                return []
+
+            group_condition = " AND ".join(f"{key} = ?" for key in group_by)
+            group_params = tuple(first[key] for key in group_by)
+            rows = conn.execute(
+                f"SELECT * FROM transformation_queue WHERE {condition} AND {group_condition} ORDER BY item_id",
+                (*params, *group_params)
+            ).fetchall()
+
+            for row in rows:
+                if row["lease_owner"] and row["lease_expires"]:
+                    logger.warning(f"Reclaiming expired lease on Item ID {row['item_id']} (previous owner: {row['lease_owner']})")
+
+            assignments = "lease_owner = ?, lease_expires = ?"
+            if mode in {"enqueued", "transform"}:
+                assignments += ", transform_status = 'processing'"
+            item_ids = [row["item_id"] for row in rows]
+            conn.executemany(
+                f"UPDATE transformation_queue SET {assignments} WHERE item_id = ?",
+                [(self.owner_id, lease_expires, item_id) for item_id in item_ids]
+            )
+            rows = conn.execute(
+                f"SELECT * FROM transformation_queue WHERE item_id IN ({', '.join('?' for _ in item_ids)}) ORDER BY item_id",
+                item_ids
+            ).fetchall()
+
+            return [self._row_to_dict(row) for row in rows]
+
+    def renew_lease(self, record_id, lease_seconds=None):
+        lease_expires = time.time() + (lease_seconds or self.lease_seconds)
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE transformation_queue SET lease_expires = ? WHERE item_id = ? AND lease_owner = ?",
+                (lease_expires, int(record_id), self.owner_id)
+            )
+            renewed = cursor.rowcount > 0
+        if not renewed:
+            logger.warning(f"Lease on Item ID {record_id} lost by {self.owner_id}")
+        return renewed
+
+    @contextmanager
+    def lease_keeper(self, record_id, interval=None):
+        # Renews the lease (of one item or a list of items) in a background thread while the block runs
+        record_ids = record_id if isinstance(record_id, (list, tuple)) else [record_id]
+        interval = interval or max(self.lease_seconds / 3, 1)
+        stop = threading.Event()
+
+        def renew():
+            while not stop.wait(interval):
+                for rid in record_ids:
+                    self.renew_lease(rid)
+
+        thread = threading.Thread(target=renew, daemon=True)
+        thread.start()
+        try:
+            yield
         finally:
-            self.lock.release()
+            stop.set()
+            thread.join()
+
+    def _release_owned(self, conn, record_id, assignments, params):
+        # Updates an item only if this instance still holds (or nobody holds) its lease
+        cursor = conn.execute(
+            f"UPDATE transformation_queue SET {assignments}, lease_owner = '', lease_expires = 0 "
+            "WHERE item_id = ? AND (lease_owner = ? OR lease_owner = '')",
+            (*params, int(record_id), self.owner_id)
+        )
+        if cursor.rowcount > 0:
+            return True
 
+        row = conn.execute("SELECT lease_owner FROM transformation_queue WHERE item_id = ?", (int(record_id),)).fetchone()
+        if row is None:
+            raise ValueError(f"Item ID '{record_id}' not found.")
+        logger.warning(f"Item ID {record_id} is now leased by {row['lease_owner']}: update from {self.owner_id} discarded")
+        return False
 
     def complete_transform(self, record_id, result, updates=None):
-        self.lock.acquire()
-        try:
-            if not os.path.exists(self.filepath):
-                raise FileNotFoundError("Queue file not found.")
-
-            df = pd.read_csv(self.filepath, dtype=str)
-
-            if record_id not in df["item_id"].values:
-                raise ValueError(f"Item ID '{record_id}' not found.")
+        updates = {key: str(value) for key, value in (updates or {}).items()}
+        for key in updates:
+            if key not in self.columns or key == "item_id":
+                raise ValueError(f"Column '{key}' not found in the table.")
 
-            df.loc[df["item_id"] == record_id, "transform_status"] = result
+        assignments = ", ".join(["transform_status = ?"] + [f"{key} = ?" for key in updates])
 
-            if updates:
-                for key, value in updates.items():
-                    if key not in df.columns:
-                        raise ValueError(f"Column '{key}' not found in the table.")
-                    df.loc[df["item_id"] == record_id, key] = str(value)
-
-            df.to_csv(self.filepath, index=False)
-        finally:
-            self.lock.release()
+        with self._transaction() as conn:
+            return self._release_owned(conn, record_id, assignments, (result, *updates.values()))
 
     
     def mark_olap_synced(self, record_id):
-        self.lock.acquire()
-        try:
-            if not os.path.exists(self.filepath):
-                return False
-
-            df = pd.read_csv(self.filepath, dtype=str)
-            if not (df["item_id"] == record_id).any():
+        with self._transaction() as conn:
+            try:
+                return self._release_owned(conn, record_id, "olap_sync = 'true'", ())
+            except ValueError:
                 return False
 
-            df.loc[df["item_id"] == record_id, "olap_sync"] = 'true'
-            df.to_csv(self.filepath, index=False)
-            return True
-        finally:
-            self.lock.release()
-    
+    def mark_olap_synced_many(self, record_ids):
+        # One transaction for a whole batch; returns the ids actually marked
+        marked = []
+        with self._transaction() as conn:
+            for record_id in record_ids:
+                try:
+                    if self._release_owned(conn, record_id, "olap_sync = 'true'", ()):
+                        marked.append(record_id)
+                except ValueError:
+                    logger.warning(f"Item ID '{record_id}' not found, OLAP sync not recorded")
+        return marked
+
+    def release_leases(self, record_ids):
+        # Gives claimed items back (e.g. after a failed OLAP sync) without changing their status:
+        # they can be claimed again at once instead of after the lease expires. Returns the ids released
+        released = []
+        if not record_ids:
+            return released
+        with self._transaction() as conn:
+            for record_id in record_ids:
+                cursor = conn.execute(
+                    "UPDATE transformation_queue SET lease_owner = '', lease_expires = 0 WHERE item_id = ? AND lease_owner = ?",
+                    (int(record_id), self.owner_id)
+                )
+                if cursor.rowcount > 0:
+                    released.append(record_id)
+                else:
+                    logger.warning(f"Item ID {record_id} is not leased by {self.owner_id}: lease not released")
+        return released
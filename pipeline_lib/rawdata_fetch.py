@@ -2,19 +2,36 @@ import os
 import pandas as pd
 import re
 import json
+from concurrent.futures import ThreadPoolExecutor
 
 import pipeline_lib.pipeline_utils as pu
 from pipeline_lib.queues import SnapshotManager, TransformationQueueManager
+from pipeline_lib.probe_cache import ProbeCache
+from pipeline_lib.stat_tree import DirectoryStatTree
 import pipeline_lib.config as cfg
 
 RAW_DATA_ROOT = cfg.RAWDATA_ROOT_PATH
 
 
 # --- Setup queues
-SNAPSHOT_QUEUE_FILE = cfg.SNAPSHOT_FILE_PATH
-TRANSFORMATION_QUEUE_FILE = cfg.QUEUE_TRANSFORMATION_FILE_PATH
-snapshot_queue = SnapshotManager(SNAPSHOT_QUEUE_FILE)
-transformation_queue = TransformationQueueManager(TRANSFORMATION_QUEUE_FILE)
+SNAPSHOT_QUEUE_FILE = cfg.SNAPSHOT_STORE_DIR_PATH
+SNAPSHOT_QUEUE_CSV_FILE = cfg.SNAPSHOT_FILE_PATH
+TRANSFORMATION_QUEUE_FILE = cfg.QUEUE_TRANSFORMATION_DB_PATH
+TRANSFORMATION_QUEUE_CSV_FILE = cfg.QUEUE_TRANSFORMATION_FILE_PATH
+snapshot_queue = SnapshotManager(SNAPSHOT_QUEUE_FILE, legacy_csv_path=SNAPSHOT_QUEUE_CSV_FILE)
+transformation_queue = TransformationQueueManager(TRANSFORMATION_QUEUE_FILE, legacy_csv_path=TRANSFORMATION_QUEUE_CSV_FILE, lease_seconds=cfg.QUEUE_LEASE_SECONDS)
+
+
+# --- Setup probe cache
+probe_cache = ProbeCache(
+    cfg.PROBE_CACHE_FILE_PATH,
+    max_entries=cfg.PROBE_CACHE_MAX_ENTRIES,
+    max_age_days=cfg.PROBE_CACHE_MAX_AGE_DAYS
+)
+
+
+# --- Setup directory stat tree (incremental folder hashing)
+stat_tree = DirectoryStatTree(cfg.STAT_TREE_FILE_PATH, full_rescan_hours=cfg.STAT_TREE_FULL_RESCAN_HOURS)
 
 
 # --- Setup Project List
@@ -28,6 +45,38 @@ logger = logging.getLogger(__name__)
 
 
 
+# --- Probe a rawdata file, reusing the cached probe while (path, size, mtime) is unchanged
+def probe_rawdata_file(full_path, raw_data_root, stat_result, regex=None):
+    rel_path = os.path.relpath(full_path, raw_data_root)
+    pattern = regex.pattern if regex is not None else None
+
+    entry = probe_cache.get(rel_path, stat_result.st_size, stat_result.st_mtime_ns)
+    changed = entry is None
+    if entry is None:
+        probe = pu.probe_file(full_path)
+        entry = {
+            "header_hash": pu.hash_header_columns(probe["header"]),
+            "dataset_type": probe["dataset_type"],
+            "has_data_row": probe["has_data_row"],
+            "regex_pattern": None,
+            "regex_matched": None
+        }
+
+    if regex is not None and entry["regex_pattern"] != pattern:
+        entry["regex_pattern"] = pattern
+        entry["regex_matched"] = bool(regex.match(os.path.basename(full_path)))
+        changed = True
+
+    if changed:
+        probe_cache.put(rel_path, stat_result.st_size, stat_result.st_mtime_ns, entry)
+
+    return {
+        "has_data_row": bool(entry["has_data_row"]),
+        "dataset_type": entry["dataset_type"],
+        "regex_matched": bool(entry["regex_matched"])
+    }
+
+
 # --- Scan weekly data folder
 def scan_rawdata_week_folder(project_metadata, data_week, raw_data_root, last_snapshot, create_missing):
     project_id = project_metadata['project_id']
@@ -45,13 +94,14 @@ def scan_rawdata_week_folder(project_metadata, data_week, raw_data_root, last_sn
     if not week_folder_info["exists"]:
         if create_missing:
             os.makedirs(folder_path, exist_ok=True)
+            pu.invalidate_rawdata_folder_index(raw_data_root, os.path.basename(os.path.dirname(folder_path)))
             logger.debug(f"Weekly Folder created for {project_id} ({project_name}): {folder_name}")
         else:
             logger.warning(f"Weekly Folder missing and not created for {project_id} ({project_name}): skipping.")
             return None
     
     # Fast Hash of directory
-    directory_hash = pu.hash_directory_fast(folder_path, project_metadata['project_is_active']) # want to ensure hash changes if project switches inactive -> active
+    directory_hash = pu.hash_directory_fast(folder_path, project_metadata['project_is_active'], stat_tree=stat_tree) # want to ensure hash changes if project switches inactive -> active
 
     if not last_snapshot.empty and last_snapshot.get("folder_hash") == directory_hash:
         #print("Weelky folder hash match. No changes made.")
@@ -74,13 +124,15 @@ def scan_rawdata_week_folder(project_metadata, data_week, raw_data_root, last_sn
     try:
         # Consider only non-empty CSV/Excel files with at least one data row
         allowed_exts = ('.csv', '.xls', '.xlsx')
-        files_available = [
-            f for f in os.listdir(folder_path)
-            if f.lower().endswith(allowed_exts)
-            and 'notused' not in f.lower()
-            and os.path.getsize(os.path.join(folder_path, f)) > 0
-            and pu.has_at_least_one_data_row(os.path.join(folder_path, f))
-        ]
+        file_probes = {}
+        for f in os.listdir(folder_path):
+            if not f.lower().endswith(allowed_exts) or 'notused' in f.lower():
+                continue
+            full_path = os.path.join(folder_path, f)
+            stat_result = os.stat(full_path)
+            if stat_result.st_size > 0:
+                file_probes[f] = probe_rawdata_file(full_path, raw_data_root, stat_result, project_config.get('files_filter_regex', None))
+        files_available = [f for f, probe in file_probes.items() if probe["has_data_row"]]
 
         if not files_available:
             logger.debug(f"Empty folder: {folder_path}")
@@ -105,7 +157,7 @@ def scan_rawdata_week_folder(project_metadata, data_week, raw_data_root, last_sn
                 if project_config_regex is None:
                     continue
                 
-                if project_config_regex.match(f):
+                if file_probes[f]["regex_matched"]:
                     #if project_id == "a01Hs00001ocUa8IAE":
                     #    print(f"DEBUG FILE MATCH")
                     regex_matched = True
@@ -116,7 +168,10 @@ def scan_rawdata_week_folder(project_metadata, data_week, raw_data_root, last_sn
                     #    print(f"Dataset type is: {dataset_type}")
                     if dataset_type is not None:
                         # Perform dataset type specific checks
-                        dataset_match = pu.check_dataset_type(full_path, dataset_type)
+                        detected_type = file_probes[f]["dataset_type"]
+                        if detected_type is None:
+                            logger.error(f"No dataset type returned for file: {full_path}")
+                        dataset_match = detected_type == dataset_type
                         #if project_id == "a01Hs00001ocUa8IAE":
                         #    print(f"Returned dataset_match: {dataset_match}")
                         #print(f"Returned dataset_match: {dataset_match}")
@@ -173,7 +228,8 @@ def scan_rawdata_week_folder(project_metadata, data_week, raw_data_root, last_sn
 
 
 
-def scan_rawdata_project_folder(project_metadata, raw_data_root, last_snapshot, create_missing):
+# --- Prepares the week folder scans of a project (one kwargs dict per week)
+def prepare_project_week_scans(project_metadata, raw_data_root, last_snapshot, create_missing):
 
     project_id = project_metadata.get("project_id")
     project_name = project_metadata.get("project_name")
@@ -181,7 +237,7 @@ def scan_rawdata_project_folder(project_metadata, raw_data_root, last_snapshot,
     project_start_date = project_metadata.get("project_start_date")
     project_end_date = project_metadata.get("project_end_date")
     project_is_active = project_metadata.get("project_is_active", False)
-    scan_log = []
+    week_scans = []
 
     logger.debug(f"Scanning project folder: {project_name} | create_missing={create_missing}")
 
@@ -224,6 +280,7 @@ def scan_rawdata_project_folder(project_metadata, raw_data_root, last_snapshot,
         if create_missing:
             project_folder_path = os.path.join(raw_data_root, project_folder_name)
             os.makedirs(project_folder_path, exist_ok=True)
+            pu.invalidate_rawdata_folder_index(raw_data_root)
             logger.info(f"Created project folder for {project_id} ({project_name}): {project_folder_name}")
         else:
             logger.warning(f"Project folder missing and not created for {project_id} ({project_name}). Skipping.")
@@ -239,7 +296,7 @@ def scan_rawdata_project_folder(project_metadata, raw_data_root, last_snapshot,
     last_snapshot['data_week'] = pd.to_datetime(last_snapshot['data_week'])
 
 
-    # ---- Iterate weeks and scan week folders
+    # ---- Collect week folders to scan
     for we_date in date_list:
         we_date = pd.to_datetime(we_date)
         
@@ -253,13 +310,30 @@ def scan_rawdata_project_folder(project_metadata, raw_data_root, last_snapshot,
         else:
             snapshot_row = pd.Series(dtype='object')
 
-        result = scan_rawdata_week_folder(
-            project_metadata=project_metadata,
-            data_week=we_date.strftime("%Y-%m-%d"),
-            raw_data_root=raw_data_root,
-            last_snapshot=snapshot_row,
-            create_missing=create_missing
-        )
+        week_scans.append({
+            "project_metadata": project_metadata,
+            "data_week": we_date.strftime("%Y-%m-%d"),
+            "raw_data_root": raw_data_root,
+            "last_snapshot": snapshot_row,
+            "create_missing": create_missing
+        })
+
+    return week_scans
+
+
+
+def scan_rawdata_project_folder(project_metadata, raw_data_root, last_snapshot, create_missing):
+    project_id = project_metadata.get("project_id")
+    project_name = project_metadata.get("project_name")
+
+    week_scans = prepare_project_week_scans(project_metadata, raw_data_root, last_snapshot, create_missing)
+    if week_scans is None:
+        return None
+
+    # ---- Iterate weeks and scan week folders
+    scan_log = []
+    for week_scan in week_scans:
+        result = scan_rawdata_week_folder(**week_scan)
         if result:
             scan_log.append(result)
 
@@ -269,13 +343,19 @@ def scan_rawdata_project_folder(project_metadata, raw_data_root, last_snapshot,
 
 
 # --- Scans all projects in Project List (Generates: current Snapshot)
-def scan_rawdata(project_df, raw_data_root, last_snapshot, create_missing):
-    logger.debug("Starting scan of rawdata folders.")
+def scan_rawdata(project_df, raw_data_root, last_snapshot, create_missing, workers=1):
+    logger.debug(f"Starting scan of rawdata folders (workers={workers}).")
 
     if not os.path.exists(raw_data_root):
         logger.error(f"Raw data root folder not found: {raw_data_root}. Aborting.")
         return None
 
+    if workers and workers > 1:
+        scan_log = scan_rawdata_parallel(project_df, raw_data_root, last_snapshot, create_missing, workers)
+        print(f"Processed {len(project_df)} projects.")
+        logger.debug("Rawdata folder scan complete.")
+        return pd.DataFrame(scan_log)
+
     scan_log = []
 
     # Iterate Projects on Project masterfile
@@ -304,15 +384,50 @@ def scan_rawdata(project_df, raw_data_root, last_snapshot, create_missing):
     return pd.DataFrame(scan_log)
 
 
+# --- Same scan as above, with week folders fanned out to a bounded thread pool
+def scan_rawdata_parallel(project_df, raw_data_root, last_snapshot, create_missing, workers):
+    scan_log = []
+    project_futures = []
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # Project-level preparation stays serial (cheap, and it mutates shared state)
+        project_counter = 0
+        for _, row in project_df.iterrows():
+            print(f"Processing project {project_counter+1}/{len(project_df)}: {row['project_id']} ({row['project_name']})")
+            project_id = row["project_id"]
+            metadata = pu.get_project_metadata(project_id, project_df)
+
+            week_scans = prepare_project_week_scans(
+                project_metadata=metadata,
+                raw_data_root=raw_data_root,
+                last_snapshot=last_snapshot,
+                create_missing=create_missing
+            )
+            futures = [executor.submit(scan_rawdata_week_folder, **week_scan) for week_scan in (week_scans or [])]
+            project_futures.append((row, futures))
+            project_counter += 1
+
+        # Collect in submission order so the snapshot rows match the serial scan
+        for row, futures in project_futures:
+            result = [week_result for week_result in (future.result() for future in futures) if week_result]
+            if result:
+                scan_log.extend(result)
+            else:
+                logger.warning(f"No scan result for project {row['project_id']} ({row['project_name']})")
+
+    return scan_log
+
+
 
 
 
 
 ######## Create snapshot ########
 
-def generate_rawdata_snapshot():
+def generate_rawdata_snapshot(workers=None):
+    workers = workers or cfg.SCAN_WORKERS
     print(f"[INFO] Creating RawData Snapshot")
-    logger.info(f"Creating rawdata snapshot")
+    logger.info(f"Creating rawdata snapshot (workers={workers})")
 
     # Filter projects with track_data enabled
     #project_df = project_list_df[project_list_df["track_data"] == True]
@@ -321,15 +436,23 @@ def generate_rawdata_snapshot():
     #print(f"Found {len(project_df)} projects to scan for rawdata.")
     
 
+    # Fresh rawdata folder index for this run
+    pu.reset_rawdata_folder_index()
+    probe_cache.load()
+    stat_tree.load()
+
     # Get last snapshot for directory hash comparison
     last_snapshot_id = snapshot_queue.get_last_snapshot_no()
     last_snapshot = snapshot_queue.get_snapshot(last_snapshot_id)
 
     # Scans and populates the snapshot dataframe
-    snapshot_df = scan_rawdata(project_df, RAW_DATA_ROOT, last_snapshot, create_missing=True)
+    snapshot_df = scan_rawdata(project_df, RAW_DATA_ROOT, last_snapshot, create_missing=True, workers=workers)
+    probe_cache.save()
+    stat_tree.save()
 
     # Append to queue
     snapshot_queue.add_snapshot(snapshot_df)
+    logger.debug(f"Snapshot store lock metrics: {snapshot_queue.lock.get_metrics()}")
 
     print(f"[INFO] RawData snapshot created")
     logger.info(f"Rawdata snapshot created")
@@ -337,6 +460,27 @@ def generate_rawdata_snapshot():
 
 
 
+######## Probe cache maintenance ########
+
+def rebuild_probe_cache(workers=None):
+    workers = workers or cfg.SCAN_WORKERS
+    print(f"[INFO] Rebuilding probe cache")
+    logger.info(f"Rebuilding probe cache (workers={workers})")
+
+    pu.reset_rawdata_folder_index()
+    probe_cache.clear()
+
+    # Full scan against an empty snapshot: every week folder is re-probed, no snapshot is written
+    empty_snapshot = snapshot_queue.get_snapshot(None)
+    scan_rawdata(project_list_df, RAW_DATA_ROOT, empty_snapshot, create_missing=False, workers=workers)
+    probe_cache.save()
+
+    print(f"[INFO] Probe cache rebuilt")
+    logger.info(f"Probe cache rebuilt")
+
+
+
+
 ######## Compare snapshots ########
 
 def compare_rawdata_snapshots():
@@ -435,10 +579,9 @@ def compare_rawdata_snapshots():
     for item in enqueued_items:
         print(f"[{i+1}/{len(enqueued_items)}] Enqueuing {item['filename']} | {item['project_id']} ({item['project_name']}) // {item['data_week']}")
         logger.info(f"[{i+1}/{len(enqueued_items)}] Enqueuing {item['filename']} | {item['project_id']} ({item['project_name']}) // {item['data_week']}")
-        transformation_queue.push(item)
         i += 1
 
-    #transformation_queue.append_df(enqueued_items)
+    transformation_queue.push_many(enqueued_items)
 
     print(f"[INFO] Comparing Snapshots: Done. Enqueued {len(enqueued_items)} new files.")
     logger.info(f"Comparing Snapshots: Done. Enqueued {len(enqueued_items)} new files.")
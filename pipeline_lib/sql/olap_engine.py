@@ -0,0 +1,129 @@
+import os
+import time
+import traceback
+
+import duckdb
+import pandas as pd
+
+import pipeline_lib.config as cfg
+from pipeline_lib.sql.query_registry import OLAP_QUERY_FILES, PreparedQueries, query_file_name
+
+DATA_PARQUET_BASE_PATH = cfg.DATA_PARQUET_DIR_PATH
+
+# --- Logger
+import logging
+logger = logging.getLogger(__name__)
+
+
+# Temp table holding the project-week rows all report queries run against
+WEEK_TABLE = "olap_week_data"
+
+
+def week_parquet_pattern(project_id, base, reporting_week):
+    base_code = base[0].upper()
+    reporting_week_str = pd.to_datetime(reporting_week, errors="coerce").strftime("%Y-%m-%d")
+    parquet_pattern = f"{project_id}/{reporting_week_str}/{project_id}_{reporting_week_str}_*_{base_code}_*.parquet"
+    return os.path.join(DATA_PARQUET_BASE_PATH, parquet_pattern)
+
+
+# One DuckDB connection per OLAP sync run. The Parquet files of a project-week are read once
+# into a temp table (load_week), then every report query of that week runs on it (run).
+# Report queries are prepared statements on the temp table, planned once per connection.
+class OlapEngine:
+    def __init__(self, threads=None):
+        self.conn = duckdb.connect()
+        if threads:
+            self.conn.execute(f"SET threads TO {int(threads)}")
+        self.queries = PreparedQueries(self.conn, WEEK_TABLE)
+        self.timings = []   # one dict per load/query: project_id, reporting_week, query, seconds, rows
+        self._week = None
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _record(self, query, seconds, rows):
+        project_id, reporting_week_str = self._week or (None, None)
+        self.timings.append({
+            "project_id": project_id,
+            "reporting_week": reporting_week_str,
+            "query": query,
+            "seconds": round(seconds, 4),
+            "rows": rows
+        })
+        logger.debug(f"OLAP {query} ({project_id} // {reporting_week_str}): {rows} rows in {seconds:.3f}s")
+
+    def load_week(self, project_id, base, reporting_week):
+        if not isinstance(base, str) or len(base) == 0:
+            print(f"Olap generate: Invalid base code")
+            return None
+
+        reporting_week_str = pd.to_datetime(reporting_week, errors="coerce").strftime("%Y-%m-%d")
+        input_path = week_parquet_pattern(project_id, base, reporting_week)
+        self._week = (project_id, reporting_week_str)
+
+        start = time.perf_counter()
+        try:
+            self.conn.execute(f"CREATE OR REPLACE TEMP TABLE {WEEK_TABLE} AS SELECT * FROM read_parquet(?)", [input_path])
+            rows = self.conn.execute(f"SELECT COUNT(*) FROM {WEEK_TABLE}").fetchone()[0]
+        except Exception as e:
+            print(f"[ERROR] Loading OLAP input failed: {e}")
+            print(f"Input Path: {input_path}")
+            logger.error(f"Loading OLAP input {input_path} failed: {e}")
+            self.conn.execute(f"DROP TABLE IF EXISTS {WEEK_TABLE}")
+            self._week = None
+            return None
+
+        self._record("load", time.perf_counter() - start, rows)
+        return rows
+
+    # Returns a DataFrame, or the typed Arrow table of the result with as_arrow=True
+    def run(self, query_name, base, target, as_arrow=False):
+        if self._week is None:
+            print(f"[ERROR] Query '{query_name}' run without a loaded project-week")
+            return None
+
+        if query_name not in OLAP_QUERY_FILES:
+            print(f"[ERROR] Query '{query_name}' doesn't exist")
+            return None
+
+        query_file = query_file_name(query_name, base)
+        project_id, reporting_week_str = self._week
+        params = {
+            "project_id": project_id,
+            "reporting_week": reporting_week_str,
+            "target": target,
+            "base": base
+        }
+
+        start = time.perf_counter()
+        try:
+            result = self.queries.execute(query_file, params)
+            report = result.arrow() if as_arrow else result.df()
+        except Exception as e:
+            print(f"[ERROR] Query execution failed: {e}")
+            print(f"Query: {query_file} - Params: {params}")
+            traceback.print_exc()
+            return None
+
+        self._record(query_name, time.perf_counter() - start, len(report))
+        return report
+
+    # Same DataFrame run() returns, from an Arrow result
+    def to_df(self, table):
+        return self.conn.from_arrow(table).df()
+
+    # Total seconds and number of runs per query (load included)
+    def timing_summary(self):
+        if not self.timings:
+            return {}
+        df = pd.DataFrame(self.timings)
+        summary = df.groupby("query", sort=False)["seconds"].agg(["count", "sum"])
+        return {q: {"runs": int(r["count"]), "seconds": round(float(r["sum"]), 3)} for q, r in summary.iterrows()}
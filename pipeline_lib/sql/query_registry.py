@@ -0,0 +1,101 @@
+import re
+import numbers
+from pathlib import Path
+
+SQL_DIR = Path(__file__).parent
+
+# --- Logger
+import logging
+logger = logging.getLogger(__name__)
+
+
+OLAP_QUERY_FILES = {
+    'smr-workflow':             'smr_workflow_{base}.sql',
+    'smr-rater-label':          'smr_rater_label_{base}.sql',
+    'smr-job-label':            'smr_job_label_{base}.sql',
+    'smr-rubric-analysis':      'smr_rubric_analysis_{base}.sql',
+    'smr-error-contribution':   'smr_error_contribution_{base}.sql',
+    'dmp-job-incorrect':        'dmp_job_incorrect_{base}.sql'
+}
+
+# Template placeholders turned into named parameters ($name) of a prepared statement.
+# {input_path} is not a value but the relation the query reads from (the OlapEngine week table).
+TEMPLATE_PARAMS = ("target", "project_id", "reporting_week", "base")
+PLACEHOLDER_RE = re.compile(r"\{(input_path|" + "|".join(TEMPLATE_PARAMS) + r")\}")
+
+
+def load_templates(sql_dir=SQL_DIR):
+    templates = {}
+    for query_file in sorted(sql_dir.glob("*.sql")):
+        templates[query_file.name] = query_file.read_text()
+    return templates
+
+
+# Every template is read from disk once, at import
+QUERY_TEMPLATES = load_templates()
+
+
+def compile_template(template, relation):
+    # Returns the statement with $name parameters and the names used, in order of appearance
+    params = []
+
+    def replace(match):
+        name = match.group(1)
+        if name == "input_path":
+            return relation
+        if name not in params:
+            params.append(name)
+        return f"${name}"
+
+    sql = PLACEHOLDER_RE.sub(replace, template).strip().rstrip(";")
+    return sql, tuple(params)
+
+
+def query_file_name(query_name, base):
+    if query_name not in OLAP_QUERY_FILES:
+        return None
+    return OLAP_QUERY_FILES[query_name].format(base=base)
+
+
+def sql_literal(value):
+    # EXECUTE arguments cannot be bound from Python, values are rendered as SQL literals
+    if value is None or value == '' or value != value:   # None, empty or NaN
+        return "NULL"
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, numbers.Integral):
+        return str(int(value))
+    if isinstance(value, numbers.Real):
+        return repr(float(value))
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+# Prepared statements of one DuckDB connection, all reading from the same relation.
+# A template is parsed and planned on its first execution only (PREPARE), later runs only
+# bind their values (EXECUTE). Prepared statements live as long as the connection.
+class PreparedQueries:
+    def __init__(self, conn, relation):
+        self.conn = conn
+        self.relation = relation
+        self._prepared = {}   # template file name -> (statement name, parameter names)
+
+    def _prepare(self, file_name):
+        if file_name in self._prepared:
+            return self._prepared[file_name]
+
+        if file_name not in QUERY_TEMPLATES:
+            raise KeyError(f"SQL template '{file_name}' not found in {SQL_DIR}")
+
+        sql, params = compile_template(QUERY_TEMPLATES[file_name], self.relation)
+        statement = "olap_" + Path(file_name).stem
+        self.conn.execute(f"PREPARE {statement} AS {sql}")
+        self._prepared[file_name] = (statement, params)
+        logger.debug(f"Prepared {statement} ({', '.join(params) or 'no parameters'})")
+        return self._prepared[file_name]
+
+    def execute(self, file_name, values):
+        statement, params = self._prepare(file_name)
+        if params:
+            args = ", ".join(f"{name} := {sql_literal(values.get(name))}" for name in params)
+            return self.conn.execute(f"EXECUTE {statement}({args})")
+        return self.conn.execute(f"EXECUTE {statement}")
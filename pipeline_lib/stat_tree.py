@@ -0,0 +1,182 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from pipeline_lib.pipeline_utils import HASHED_FILE_EXTS
+
+# --- Logger
+import logging
+logger = logging.getLogger(__name__)
+
+
+# Directory mtimes closer than this to the listing time are not trusted (racy mtime granularity)
+RACY_MTIME_NS = 2 * 10**9
+
+
+# Persistent directory stat tree: last seen st_mtime_ns, subfolders and file sizes per folder.
+# A folder whose mtime did not change is not listed again and its files are not re-stat'ed.
+# Note: overwriting a file in place does not touch the folder mtime, hence every node is
+# fully re-listed at least once every full_rescan_hours.
+class DirectoryStatTree:
+    def __init__(self, filepath, full_rescan_hours=24, max_age_days=30):
+        self.filepath = filepath
+        self.full_rescan_hours = full_rescan_hours
+        self.max_age_days = max_age_days
+        self.columns = [
+            'dir_path',
+            'mtime_ns',
+            'dirs',
+            'files',
+            'listed_at',
+            'last_seen'
+        ]
+        self._lock = threading.Lock()
+        self._nodes = None
+        self._dirty = set()
+        self.reused = 0
+        self.listed = 0
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.filepath, timeout=30)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def _init_db(self, conn):
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS stat_tree (
+                dir_path    TEXT PRIMARY KEY,
+                mtime_ns    INTEGER NOT NULL,
+                dirs        TEXT NOT NULL,
+                files       TEXT NOT NULL,
+                listed_at   REAL NOT NULL,
+                last_seen   REAL NOT NULL
+            )
+        """)
+
+    def load(self):
+        with self._lock:
+            self._load()
+
+    def _load(self):
+        folder = os.path.dirname(self.filepath)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+        with self._connect() as conn:
+            self._init_db(conn)
+            rows = conn.execute(f"SELECT {', '.join(self.columns)} FROM stat_tree").fetchall()
+
+        self._nodes = {}
+        for row in rows:
+            node = dict(zip(self.columns, row))
+            node["dirs"] = json.loads(node["dirs"])
+            node["files"] = json.loads(node["files"])
+            self._nodes[node["dir_path"]] = node
+        self._dirty = set()
+        self.reused = 0
+        self.listed = 0
+        logger.debug(f"Directory stat tree loaded: {len(self._nodes)} folders")
+
+    def _list_dir(self, path, mtime_ns):
+        dirs = []
+        files = {}
+        with os.scandir(path) as it:
+            for entry in it:
+                if entry.is_dir():
+                    dirs.append(entry.name)
+                    continue
+                size = None
+                if os.path.splitext(entry.name)[1].lower() in HASHED_FILE_EXTS:
+                    try:
+                        size = entry.stat().st_size
+                    except OSError:
+                        pass  # inaccessible file: left out of the hash
+                files[entry.name] = size
+
+        now = time.time()
+        # A folder modified during the same mtime tick as the listing must be listed again next time
+        listed_at = now if (now * 10**9 - mtime_ns) > RACY_MTIME_NS else 0.0
+        return {
+            "dir_path": path,
+            "mtime_ns": mtime_ns,
+            "dirs": dirs,
+            "files": files,
+            "listed_at": listed_at,
+            "last_seen": now
+        }
+
+    def _get_node(self, path):
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+        key = os.path.normpath(path)
+
+        with self._lock:
+            if self._nodes is None:
+                self._load()
+            node = self._nodes.get(key)
+
+        rescan_before = time.time() - self.full_rescan_hours * 3600
+        if node is not None and node["mtime_ns"] == mtime_ns and node["listed_at"] >= rescan_before:
+            with self._lock:
+                node["last_seen"] = time.time()
+                self._dirty.add(key)
+                self.reused += 1
+            return node
+
+        try:
+            node = self._list_dir(path, mtime_ns)
+        except OSError:
+            return None
+        node["dir_path"] = key
+
+        with self._lock:
+            self._nodes[key] = node
+            self._dirty.add(key)
+            self.listed += 1
+        return node
+
+    # Same shape as os.walk (top-down), with {filename: size} instead of the file list
+    def walk(self, top):
+        stack = [top]
+        while stack:
+            path = stack.pop()
+            node = self._get_node(path)
+            if node is None:
+                continue
+            yield path, list(node["dirs"]), dict(node["files"])
+            stack.extend(os.path.join(path, d) for d in reversed(node["dirs"]))
+
+    def save(self):
+        with self._lock:
+            if self._nodes is None:
+                return
+
+            records = [self._nodes[path] for path in self._dirty if path in self._nodes]
+            cutoff = time.time() - self.max_age_days * 86400
+
+            with self._connect() as conn, conn:
+                self._init_db(conn)
+                conn.executemany(
+                    f"INSERT OR REPLACE INTO stat_tree ({', '.join(self.columns)}) VALUES ({', '.join('?' for _ in self.columns)})",
+                    [
+                        (n["dir_path"], n["mtime_ns"], json.dumps(n["dirs"]), json.dumps(n["files"]), n["listed_at"], n["last_seen"])
+                        for n in records
+                    ]
+                )
+                evicted = conn.execute("DELETE FROM stat_tree WHERE last_seen < ?", (cutoff,)).rowcount
+
+            self._dirty = set()
+            if evicted:
+                self._nodes = None
+
+        logger.info(f"Directory stat tree saved: {len(records)} folders written, {evicted} evicted (reused={self.reused}, listed={self.listed})")
@@ -1,9 +1,12 @@
 import os
 import traceback
 import json
+import time
 import pandas as pd
 import os
 import glob
+import multiprocessing as mp
+from multiprocessing.connection import wait
 
 import pipeline_lib.pipeline_utils as pu
 import pipeline_lib.config as cfg
@@ -15,8 +18,9 @@ PARQUET_BASE_DIR = os.path.join(cfg.DATA_TRANSFORMED_DIR_PATH)
 UQV2_BASE_DIR = os.path.join(cfg.UQV2_DIR_PATH)
 
 # --- Setup queues
-TRANSFORMATION_QUEUE_FILE = cfg.QUEUE_TRANSFORMATION_FILE_PATH
-transformation_queue = TransformationQueueManager(TRANSFORMATION_QUEUE_FILE)
+TRANSFORMATION_QUEUE_FILE = cfg.QUEUE_TRANSFORMATION_DB_PATH
+TRANSFORMATION_QUEUE_CSV_FILE = cfg.QUEUE_TRANSFORMATION_FILE_PATH
+transformation_queue = TransformationQueueManager(TRANSFORMATION_QUEUE_FILE, legacy_csv_path=TRANSFORMATION_QUEUE_CSV_FILE, lease_seconds=cfg.QUEUE_LEASE_SECONDS)
 
 # --- Setup Project List
 PROJECT_MASTERFILE = cfg.PROJECT_INFO_FILE_PATH
@@ -196,23 +200,23 @@ def process_file(raw_file_path, project_metadata, data_week):
             process_file_dict["transform_info"] = {"transform_error": "content_weeks_list_empty" } | transformed_dict
             return False, process_file_dict
 
-        for content_week in unique_content_weeks:
+        # Schema is enforced once on the whole file, rows are grouped by content week in one pass
+        legacy_table = pu.enforce_parquet_schema(df_transformed)
+        uqv2_table = pu.enforce_parquet_schema(uqv2_df)
+
+        for content_week, (df_cw, uqv2_df_cw) in pu.split_tables_by_key(df_transformed["content_week"], legacy_table, uqv2_table):
             content_weeks_list.append(content_week)
             cw_str = pd.to_datetime(content_week, errors="coerce").strftime("%Y%m%d")
             
             # Legacy output
             parquet_output_name = f"{project_id}_{data_week_str}_{name_label}_{base_code}_{cw_str}.parquet"
             parquet_filenames.append(parquet_output_name)
-            mask = df_transformed["content_week"] == content_week
-            df_cw = df_transformed.loc[mask]
-            df_cw.to_parquet(os.path.join(parquet_output_folder, parquet_output_name), index=False)
+            pu.write_parquet_table(df_cw, os.path.join(parquet_output_folder, parquet_output_name))
 
             # UQv2 output
             uqv2_output_name = f"{project_id}_{data_week_str}_{name_label}_{cw_str}_UQv2.parquet"
             uqv2_filenames.append(uqv2_output_name)
-            mask_uqv2 = uqv2_df["content_week"] == content_week
-            uqv2_df_cw = uqv2_df.loc[mask_uqv2]
-            uqv2_df_cw.to_parquet(os.path.join(uqv2_output_folder, uqv2_output_name), index=False)
+            pu.write_parquet_table(uqv2_df_cw, os.path.join(uqv2_output_folder, uqv2_output_name))
             
         process_file_dict["output_filenames"]   = parquet_filenames
         process_file_dict["content_weeks"]      = content_weeks_list
@@ -222,7 +226,7 @@ def process_file(raw_file_path, project_metadata, data_week):
         logger.error(f"Error transforming {raw_file_path}: {e} - Traceback: {traceback.format_exc()}")
         print(f"Error transforming {raw_file_path}: {e} - Traceback: {traceback.format_exc()}")
         #print(traceback.format_exc())
-        return False, {"transform_error": f"{e}"}, None
+        return False, {"transform_info": {"transform_error": f"{e}"}}
     
 
 # Process enqueued item to trasform
@@ -278,11 +282,47 @@ def process_item(item):
     return result, process_item_dict
 
 
-def transform_enqueued_items():
-    total_enqueued = transformation_queue.count(status="enqueued")
+# Store the transformation outcome of a claimed item back into the queue
+
+def complete_item(enqueued_item, result, process_dict):
+    output_filenames    = process_dict.get("output_filenames", "")
+    content_weeks       = process_dict.get("content_weeks", "")
+
+    transform_info      = process_dict.get("transform_info", {})
+    transform_error     = transform_info.get("transform_error", {})
+
+
+    # Validate processing output
+    if result:
+        transform_result = "transformed"
+        logger.info(f"Processed and saved: {output_filenames} - Content Weeks: {content_weeks}")
+    else:
+        transform_result = "failed"
+        print(f"Transformation failed: {transform_error}")
+        logger.error(f"Failed to process: {enqueued_item['filename']}")
+
+    # Enqueue
+    transformation_queue.complete_transform(enqueued_item['item_id'], transform_result, {
+        "output_filenames": json.dumps(output_filenames),
+        "content_weeks": json.dumps(content_weeks),
+        "transform_info": json.dumps(transform_info)
+    })
+
+
+def transform_enqueued_items(workers=None):
+    # Items left 'processing' by a dead instance are reclaimed once their lease expires
+    total_enqueued = transformation_queue.count(status="enqueued") + transformation_queue.count(status="expired")
     print(f"[INFO] Transforming enqueued files ({total_enqueued} files)")
     logger.info(f"Transforming enqueued files ({total_enqueued} files)")
 
+    # Fresh rawdata folder index for this run
+    pu.reset_rawdata_folder_index()
+
+    if workers and workers > 1:
+        transform_enqueued_items_parallel(total_enqueued, workers)
+        logger.info(f"Transformation complete")
+        return
+
     for i in range(total_enqueued):
         enqueued_item = transformation_queue.pop()
         if not enqueued_item:
@@ -294,32 +334,144 @@ def transform_enqueued_items():
         print(f"[{i+1}/{total_enqueued}] Processing ItemID {enqueued_item_id} | {enqueued_item['project_id']} | {enqueued_item['project_name']} | WE {enqueued_item['data_week']}")
         
         # START PROCESSING ENQUEUED ITEM
-        result, process_dict = process_item(enqueued_item)
+        with transformation_queue.lease_keeper(enqueued_item_id):
+            result, process_dict = _run_item(enqueued_item)
+        complete_item(enqueued_item, result, process_dict)
+        # END PROCESSING ENQUEUED ITEM
+
+    #print(f"[INFO] Transformation complete")
+    logger.info(f"Transformation complete")
 
-        output_filenames    = process_dict.get("output_filenames", "")
-        content_weeks       = process_dict.get("content_weeks", "")
 
-        transform_info      = process_dict.get("transform_info", {})
-        transform_error     = transform_info.get("transform_error", {})
-        
+# --- Parallel transformation: a pool of long-lived worker processes, one claimed item each at a time.
+# Workers import the pipeline once (spawn on Windows re-imports every module), a worker running
+# past the item timeout is killed and replaced.
 
-        # Validate processing output
-        if result:
-            transform_result = "transformed"
-            logger.info(f"Processed and saved: {output_filenames} - Content Weeks: {content_weeks}")
-        else:
-            transform_result = "failed"
-            print(f"Transformation failed: {transform_error}")
-            logger.error(f"Failed to process: {enqueued_item['filename']}")
-        
-        # Enqueue
-        transformation_queue.complete_transform(enqueued_item_id, transform_result, {
-            "output_filenames": json.dumps(output_filenames),
-            "content_weeks": json.dumps(content_weeks),
-            "transform_info": json.dumps(transform_info)
-        })
+def _run_item(item):
+    # Serial loop and worker processes: any exception is reported back as a failed item
+    try:
+        return process_item(item)
+    except Exception as e:
+        logger.error(f"Worker error on Item ID {item['item_id']}: {e} - Traceback: {traceback.format_exc()}")
+        return False, {"transform_info": {"transform_error": f"worker_exception: {e}"}}
 
-        # END PROCESSING ENQUEUED ITEM
 
-    #print(f"[INFO] Transformation complete")
-    logger.info(f"Transformation complete")
+def _transform_worker_loop(conn):
+    # Items are received one at a time, None (or a closed pipe) stops the worker
+    try:
+        while True:
+            try:
+                item = conn.recv()
+            except EOFError:
+                break
+            if item is None:
+                break
+            conn.send(_run_item(item))
+    finally:
+        conn.close()
+
+
+class TransformWorker:
+    def __init__(self):
+        self.conn, child_conn = mp.Pipe()
+        self.process = mp.Process(target=_transform_worker_loop, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.item = None
+        self.deadline = None
+
+    def submit(self, item, timeout):
+        self.item = item
+        self.deadline = time.monotonic() + timeout
+        self.conn.send(item)
+
+    def done(self):
+        item, self.item, self.deadline = self.item, None, None
+        return item
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except (OSError, BrokenPipeError):
+            pass
+        self.process.join(timeout=10)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+        self.conn.close()
+
+    def kill(self):
+        self.process.terminate()
+        self.process.join()
+        self.conn.close()
+
+
+def transform_enqueued_items_parallel(total_enqueued, workers, item_timeout=None):
+    item_timeout = item_timeout or cfg.TRANSFORM_ITEM_TIMEOUT
+    workers = min(workers, total_enqueued)
+    if workers < 1:
+        return
+    logger.info(f"Parallel transformation: {workers} workers, {item_timeout}s timeout per item")
+
+    claimed = 0
+    pool = [TransformWorker() for _ in range(workers)]
+    renew_interval = max(transformation_queue.lease_seconds / 3, 1)
+    last_renewal = time.monotonic()
+
+    try:
+        while True:
+            # Hand out items to idle workers
+            for worker in pool:
+                if worker.item is not None or claimed >= total_enqueued:
+                    continue
+                enqueued_item = transformation_queue.pop()
+                if not enqueued_item:
+                    logger.warning(f"Queue empty before expected!")
+                    total_enqueued = claimed
+                    break
+                claimed += 1
+
+                print(f"[{claimed}/{total_enqueued}] Processing ItemID {enqueued_item['item_id']} | {enqueued_item['project_id']} | {enqueued_item['project_name']} | WE {enqueued_item['data_week']}")
+                logger.debug(f"[{claimed}/{total_enqueued}] Processing Item ID {enqueued_item['item_id']}: {enqueued_item}")
+                worker.submit(enqueued_item, item_timeout)
+
+            busy = {worker.conn: worker for worker in pool if worker.item is not None}
+            if not busy:
+                break
+
+            for conn in wait(list(busy), timeout=1.0):
+                worker = busy[conn]
+                try:
+                    result, process_dict = conn.recv()
+                except EOFError:
+                    # Worker died without reporting (crash, killed, out of memory): replaced
+                    worker.process.join()
+                    exitcode = worker.process.exitcode
+                    enqueued_item = worker.done()
+                    logger.error(f"Worker for Item ID {enqueued_item['item_id']} exited without result (exit code {exitcode})")
+                    worker.conn.close()
+                    pool[pool.index(worker)] = TransformWorker()
+                    complete_item(enqueued_item, False, {"transform_info": {"transform_error": f"worker_crashed (exit code {exitcode})"}})
+                    continue
+                complete_item(worker.done(), result, process_dict)
+
+            # Kill items over their time budget, the worker is replaced
+            now = time.monotonic()
+            for i, worker in enumerate(pool):
+                if worker.item is None or now < worker.deadline:
+                    continue
+                enqueued_item = worker.done()
+                worker.kill()
+                pool[i] = TransformWorker()
+                logger.error(f"Item ID {enqueued_item['item_id']} timed out after {item_timeout}s: {enqueued_item['filename']}")
+                complete_item(enqueued_item, False, {"transform_info": {"transform_error": f"timeout ({item_timeout}s)"}})
+
+            # Keep the leases of running items alive
+            if now - last_renewal >= renew_interval:
+                for worker in pool:
+                    if worker.item is not None:
+                        transformation_queue.renew_lease(worker.item['item_id'])
+                last_renewal = now
+    finally:
+        for worker in pool:
+            worker.stop()
@@ -23,6 +23,8 @@ def archive_old_folders():
         raise ValueError("cfg.START_DATE_DEFAULT is missing or not parseable")
     default_date = default_ts.date()
 
+    folder_index = pu.get_rawdata_folder_index(cfg.RAWDATA_ROOT_PATH)
+
     for idx, row in project_df.iterrows():
         print(f"Processing project {idx+1}/{total}: {row.get('project_id')} ({row.get('project_name')})")
 
@@ -40,14 +42,14 @@ def archive_old_folders():
         os.makedirs(archive_path, exist_ok=True)
 
         try:
-            entries = os.listdir(folder_path)
+            week_folders = folder_index.week_folders(project_folder["name"])
         except OSError as e:
             print(f"  - Cannot list folder: {folder_path} ({e})")
             continue
 
-        for name in entries:
-            we_folder_path = os.path.join(folder_path, name)
-            if not (os.path.isdir(we_folder_path) and name.startswith("WE ")):
+        moved = False
+        for name, we_folder_path in sorted(week_folders.items()):
+            if not name.startswith("WE "):
                 continue
 
             # Parse date after "WE "
@@ -74,10 +76,14 @@ def archive_old_folders():
 
                 try:
                     shutil.move(we_folder_path, dest)
+                    moved = True
                     print(f"    - Archived: {name} -> {dest}")
                 except OSError as e:
                     print(f"    - Failed to move {we_folder_path} -> {dest} ({e})")
 
+        if moved:
+            folder_index.invalidate(project_folder["name"])
+
 
 if __name__ == "__main__":
     archive_old_folders()
@@ -1,5 +1,6 @@
 import os
 import sys
+import pandas as pd
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
@@ -7,22 +8,31 @@ import pipeline_lib.config as cfg
 import pipeline_lib.pipeline_utils as pu
 from pipeline_lib.project_transformers.transformer_utils import process_dataframe
 from pipeline_lib.queues import TransformationQueueManager, SnapshotManager
+from pipeline_lib.olap_manifest import OlapManifest
 
-SNAPSHOT_QUEUE_FILE = cfg.SNAPSHOT_FILE_PATH
-TRANSFORMATION_QUEUE_FILE = cfg.QUEUE_TRANSFORMATION_FILE_PATH
+SNAPSHOT_QUEUE_FILE = cfg.SNAPSHOT_STORE_DIR_PATH
+SNAPSHOT_QUEUE_CSV_FILE = cfg.SNAPSHOT_FILE_PATH
+TRANSFORMATION_QUEUE_FILE = cfg.QUEUE_TRANSFORMATION_DB_PATH
+TRANSFORMATION_QUEUE_CSV_FILE = cfg.QUEUE_TRANSFORMATION_FILE_PATH
 
 PROJECT_MASTERFILE = cfg.PROJECT_INFO_FILE_PATH
 
 # --- Setup queues
-snapshot_queue = SnapshotManager(SNAPSHOT_QUEUE_FILE)
-transformation_queue = TransformationQueueManager(TRANSFORMATION_QUEUE_FILE)
+snapshot_queue = SnapshotManager(SNAPSHOT_QUEUE_FILE, legacy_csv_path=SNAPSHOT_QUEUE_CSV_FILE)
+transformation_queue = TransformationQueueManager(TRANSFORMATION_QUEUE_FILE, legacy_csv_path=TRANSFORMATION_QUEUE_CSV_FILE, lease_seconds=cfg.QUEUE_LEASE_SECONDS)
+olap_manifest = OlapManifest(cfg.OLAP_MANIFEST_FILE_PATH)
 
 # --- Setup Project List
 project_list_df = pu.load_project_info(PROJECT_MASTERFILE, active_only=False)
 
 
-def enqueue_project(project_id, data_week=None):
-    # Uses available data weeks from last snapshot
+def enqueue_project(project_id, data_week=None, force_olap=False):
+    # Uses available data weeks from last snapshot.
+    # Weeks whose transformed Parquet comes out unchanged are skipped by the OLAP sync (OLAP manifest),
+    # force_olap=True regenerates their reports anyway.
+    if force_olap:
+        olap_manifest.forget(project_id, pd.to_datetime(data_week).strftime("%Y-%m-%d") if data_week else None)
+
     project_info = project_list_df.loc[project_list_df["project_id"] == project_id]
     project_name = project_info["project_name"]
 
@@ -58,5 +68,6 @@ def enqueue_project(project_id, data_week=None):
     i = 0
     for item in enqueued_items:
         print(f"[{i+1}/{len(enqueued_items)}] Enqueuing {item['filename']} | {item['project_id']} ({item['project_name']}) // {item['data_week']}")
-        transformation_queue.push(item)
         i += 1
+
+    transformation_queue.push_many(enqueued_items)
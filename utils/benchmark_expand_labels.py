@@ -0,0 +1,97 @@
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pipeline_lib.project_transformers.transformer_utils as tu
+
+# Benchmark of the label list -> wide columns expansion (r_*/a_* frames in UQD/CVS):
+#   legacy: explode + row-wise split + pivot_table(aggfunc=first)
+#   vectorized: tu.expand_label_columns (str.partition + drop_duplicates/unstack)
+
+
+def legacy_expand_label_columns(df, label_col, prefix, excluded_list=None):
+    excluded_set = set(x.strip() for x in (excluded_list or []))
+    tmp = df[[label_col]].copy()
+    tmp[label_col] = tmp[label_col].apply(lambda x: x if isinstance(x, list) else [])
+    exploded = tmp.explode(label_col).reset_index()
+
+    def split_kv(s):
+        if not isinstance(s, str) or "::" not in s:
+            return pd.Series({f"{prefix}_key": None, f"{prefix}_value": None})
+        k, v = s.split("::", 1)
+        k_clean = k.strip()
+        return pd.Series({f"{prefix}_key": k_clean, f"{prefix}_value": v})
+
+    kv = exploded[label_col].apply(split_kv)
+    exploded = pd.concat([exploded, kv], axis=1)
+    exploded = exploded[~exploded[f"{prefix}_key"].isin(excluded_set)]
+
+    pivoted = (
+        exploded
+        .dropna(subset=[f"{prefix}_key"])
+        .pivot_table(
+            index=exploded["index"],
+            columns=f"{prefix}_key",
+            values=f"{prefix}_value",
+            aggfunc=lambda x: x.iloc[0] if len(x) else None,
+        )
+    )
+    pivoted.columns = [f"{prefix}_{col}" for col in pivoted.columns]
+    pivoted = pivoted.reindex(df.index, fill_value=None)
+    return pivoted
+
+
+def build_label_lists(rows, labels, seed=0):
+    rng = np.random.default_rng(seed)
+    keys = [f"label_{i:02d}" for i in range(labels)]
+    answers = np.array(["yes", "no", "n/a", "partially::correct", ""], dtype=object)
+
+    values = []
+    for _ in range(rows):
+        roll = rng.random()
+        if roll < 0.02:
+            values.append(None)  # missing decision data
+            continue
+        n = rng.integers(1, labels + 1)
+        row = [f" {k} ::{answers[a]}" if a == 4 else f"{k}::{answers[a]}"
+               for k, a in zip(rng.choice(keys, size=n, replace=False), rng.integers(0, len(answers), size=n))]
+        if roll < 0.05:
+            row += ["malformed label", 42, f"{keys[0]}::duplicate"]  # ignored / first value wins
+        values.append(row)
+    return pd.DataFrame({"labels": values}, index=pd.RangeIndex(rows) * 3)
+
+
+def timed(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return result, (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark legacy VS vectorized expand_label_columns.")
+    parser.add_argument('--rows', type=int, default=20_000)
+    parser.add_argument('--labels', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=1)
+    args = parser.parse_args()
+
+    df = build_label_lists(args.rows, args.labels)
+    excluded = ["label_03", " label_07 "]
+
+    legacy, legacy_time = timed(lambda: legacy_expand_label_columns(df, "labels", "r", excluded), args.repeat)
+    vectorized, vectorized_time = timed(lambda: tu.expand_label_columns(df, "labels", "r", excluded), args.repeat)
+
+    pd.testing.assert_frame_equal(legacy, vectorized, check_index_type=False, check_names=False)
+
+    print(f"Rows: {args.rows} x {args.labels} labels -> {vectorized.shape[1]} columns")
+    print(f"Legacy pivot_table:    {legacy_time*1000:9.1f} ms")
+    print(f"expand_label_columns:  {vectorized_time*1000:9.1f} ms  (x{legacy_time / vectorized_time:.1f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pipeline_lib.project_transformers.transformer_utils as tu
+
+# Benchmark of the transformers' ID validation on a single column:
+#   legacy: series.apply(tu.id_format_check)
+#   column: tu.check_id_column(series) -> (validated, invalid_mask)
+
+
+def build_id_column(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    valid = rng.integers(10**11, 10**13, size=rows).astype(str).astype(object)
+
+    # ~10% broken values, as found in Excel exports
+    broken = rng.random(rows) < 0.10
+    kinds = rng.integers(0, 6, size=rows)
+    samples = np.array([" 123456789012 ", "1.23457E+11", "1234567890", "", "n/a", None], dtype=object)
+    values = np.where(broken, samples[kinds], valid)
+
+    # A few native ints and floats, like mixed-type Excel columns
+    values[rng.random(rows) < 0.01] = 123456789012
+    values[rng.random(rows) < 0.01] = 1.23456789012e11
+    return pd.Series(values, dtype=object)
+
+
+def timed(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return result, (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark row-wise id_format_check VS check_id_column.")
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    ids = build_id_column(args.rows)
+
+    legacy, legacy_time = timed(lambda: ids.apply(tu.id_format_check), args.repeat)
+    (validated, invalid_mask), column_time = timed(lambda: tu.check_id_column(ids), args.repeat)
+
+    same_values = all(
+        (pd.isna(a) and pd.isna(b)) or (type(a) is type(b) and a == b)
+        for a, b in zip(legacy, validated)
+    )
+    assert same_values, "Validated values differ from id_format_check"
+    assert (invalid_mask == legacy.isnull()).all(), "Invalid mask differs from id_format_check"
+
+    print(f"Rows: {args.rows} ({int(invalid_mask.sum())} invalid)")
+    print(f"Row-wise id_format_check: {legacy_time*1000:9.1f} ms")
+    print(f"check_id_column:          {column_time*1000:9.1f} ms  (x{legacy_time / column_time:.1f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import duckdb
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pipeline_lib.pipeline_utils as pu
+
+# Parquet size and DuckDB scan time of a transformed AUDIT week:
+#   inferred: df.to_parquet on the transformer output (to_long categoricals, object strings,
+#             float64, string dates)
+#   enforced: pu.enforce_parquet_schema (dictionary strings, plain job_id, date32, fixed numeric types)
+# The OLAP audit queries must return the same reports on both.
+
+SQL_DIR = os.path.join(os.path.dirname(__file__), '..', 'pipeline_lib', 'sql')
+QUERIES = ["smr_workflow_audit.sql", "smr_rater_label_audit.sql", "smr_job_label_audit.sql", "smr_error_contribution_audit.sql"]
+
+
+class SafeDict(dict):
+    def __missing__(self, key):
+        return f"{{{key}}}"
+
+
+def build_audit_output(jobs, labels, seed=0):
+    rng = np.random.default_rng(seed)
+    raters = np.array([str(x) for x in rng.integers(10**11, 10**12, size=500)], dtype=object)
+    answers = np.array(["yes", "no", "n/a", "partially"], dtype=object)
+    job_dates = pd.Timestamp("2025-06-28") + pd.to_timedelta(rng.integers(0, 7, size=jobs), unit="D")
+
+    base = pd.DataFrame({
+        "workflow": np.array(["queue_a", "queue_b", "queue_c"], dtype=object)[rng.integers(0, 3, size=jobs)],
+        "job_date": job_dates.strftime("%Y-%m-%d"),
+        "rater_id": raters[rng.integers(0, len(raters), size=jobs)],
+        "auditor_id": raters[rng.integers(0, 50, size=jobs)],
+        "job_id": np.array([str(x) for x in np.arange(10**12, 10**12 + jobs)], dtype=object),
+    })
+    df = base.loc[base.index.repeat(labels)].reset_index(drop=True)
+    df["parent_label"] = np.tile(np.array([f"label_{i:02d}" for i in range(labels)], dtype=object), jobs)
+    df["rater_response"] = answers[rng.integers(0, len(answers), size=len(df))]
+    df["auditor_response"] = np.where(rng.random(len(df)) < 0.8, df["rater_response"], answers[rng.integers(0, len(answers), size=len(df))])
+    df["is_label_binary"] = df["parent_label"].isin(["label_00", "label_01"])
+    df["confusion_type"] = np.where(df["is_label_binary"], np.array(["TP", "TN", "FP", "FN"], dtype=object)[rng.integers(0, 4, size=len(df))], "")
+    df["is_correct"] = df["rater_response"] == df["auditor_response"]
+    # non-dyadic weights too (0.1, 0.3): any precision loss shows in the weighted sums
+    df["weight"] = df["parent_label"].map({"label_02": 2.0, "label_03": 0.1, "label_04": 0.3}).fillna(1.0)
+
+    df = df.astype({col: "category" for col in ["rater_id", "job_id", "workflow"]})  # as left by tu.to_long
+    df.insert(0, "content_week", "2025-07-04")
+    df.insert(0, "reporting_week", pd.Timestamp("2025-07-04"))
+    df.insert(0, "project_id", "BENCH00001")
+    return df
+
+
+def run_queries(input_path, repeat):
+    reports = {}
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for query in QUERIES:
+            with open(os.path.join(SQL_DIR, query)) as f:
+                sql = f.read().format_map(SafeDict({"input_path": f"'{input_path}'", "target": 0.9}))
+            reports[query] = duckdb.query(sql).to_df()
+    return reports, (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark inferred VS enforced Parquet schema.")
+    parser.add_argument('--jobs', type=int, default=100_000)
+    parser.add_argument('--labels', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=1)
+    args = parser.parse_args()
+
+    df = build_audit_output(args.jobs, args.labels)
+    root = tempfile.mkdtemp(prefix="parquet_schema_bench_")
+    try:
+        inferred_path = os.path.join(root, "inferred.parquet")
+        enforced_path = os.path.join(root, "enforced.parquet")
+        df.to_parquet(inferred_path, index=False)
+        pq.write_table(pu.enforce_parquet_schema(df), enforced_path)
+
+        inferred_reports, inferred_time = run_queries(inferred_path, args.repeat)
+        enforced_reports, enforced_time = run_queries(enforced_path, args.repeat)
+
+        for query in QUERIES:
+            sort_cols = list(inferred_reports[query].columns)
+            pd.testing.assert_frame_equal(
+                inferred_reports[query].sort_values(sort_cols).reset_index(drop=True),
+                enforced_reports[query].sort_values(sort_cols).reset_index(drop=True),
+                check_dtype=False,
+                rtol=1e-12  # summation order noise only; float32 weights drift by ~1e-8
+            )
+
+        inferred_size = os.path.getsize(inferred_path)
+        enforced_size = os.path.getsize(enforced_path)
+        print(f"Rows: {len(df)} ({args.jobs} jobs x {args.labels} labels)")
+        print(f"Inferred schema: {inferred_size / 2**20:7.2f} MiB  queries {inferred_time*1000:8.1f} ms")
+        print(f"Enforced schema: {enforced_size / 2**20:7.2f} MiB  queries {enforced_time*1000:8.1f} ms  "
+              f"(size x{inferred_size / enforced_size:.2f}, time x{inferred_time / enforced_time:.2f})")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pipeline_lib.pipeline_utils as pu
+from pipeline_lib.config import DATASET_HEADER
+
+# Benchmark of the scanner's per-file checks on large files:
+#   legacy: has_at_least_one_data_row (pandas, 2 rows) + get_dataset_type (pandas header, spotcheck_data first)
+#   probe:  pu.probe_file (single open, csv module / openpyxl read_only)
+# Small CSV edge cases (blank and delimiter-only rows) are checked against the legacy results first.
+
+UQD_HEADER = ",".join(DATASET_HEADER["UQD"])
+CSV_EDGE_CASES = {
+    "header_only":          UQD_HEADER + "\n",
+    "delimiter_only_row":   UQD_HEADER + "\n" + "," * (len(DATASET_HEADER["UQD"]) - 1) + "\n",
+    "short_delimiter_row":  UQD_HEADER + "\n,,\n",
+    "blank_then_data":      UQD_HEADER + "\n\n1,2,3,4,5,6,7,8\n",
+    "whitespace_row":       UQD_HEADER + "\n   \n",
+    "tab_row":              UQD_HEADER + "\n\t\n",
+    "quoted_empty_row":     UQD_HEADER + '\n"",""\n',
+    "spaces_around_delim":  UQD_HEADER + "\n , \n",
+    "leading_blank_lines":  "\n\n" + UQD_HEADER + "\n1,2\n",
+}
+
+
+def legacy_has_data_row(file_path):
+    if file_path.lower().endswith(".csv"):
+        df_sample = pd.read_csv(file_path, nrows=2)
+    else:
+        df_sample = pd.read_excel(file_path, nrows=2)
+    return len(df_sample) >= 1
+
+
+def legacy_dataset_type(file_path):
+    if file_path.lower().endswith(".csv"):
+        df = pd.read_csv(file_path, nrows=0, dtype=str)
+    else:
+        try:
+            df = pd.read_excel(file_path, sheet_name="spotcheck_data", nrows=0, dtype=str, engine="openpyxl")
+        except ValueError:
+            df = pd.read_excel(file_path, sheet_name=0, nrows=0, dtype=str, engine="openpyxl")
+
+    header = df.columns.str.strip().tolist()
+    for dtype, required_cols in DATASET_HEADER.items():
+        if set(required_cols).issubset(header):
+            return dtype
+    return None
+
+
+def build_file(folder, ext, rows):
+    columns = DATASET_HEADER["UQD"]
+    df = pd.DataFrame(
+        np.random.randint(10**11, 10**12, size=(rows, len(columns))).astype(str),
+        columns=columns
+    )
+    file_path = os.path.join(folder, f"bench_{rows}.{ext}")
+    if ext == "csv":
+        df.to_csv(file_path, index=False)
+    else:
+        df.to_excel(file_path, index=False)
+    return file_path
+
+
+def check_edge_cases(folder):
+    for name, content in CSV_EDGE_CASES.items():
+        file_path = os.path.join(folder, f"edge_{name}.csv")
+        with open(file_path, "w", newline="") as f:
+            f.write(content)
+        legacy = (legacy_has_data_row(file_path), legacy_dataset_type(file_path))
+        probe = pu.probe_file(file_path)
+        assert legacy == (probe["has_data_row"], probe["dataset_type"]), f"{name}: {legacy} VS {probe}"
+
+    # .xls that cannot be read here (no xlrd / not a real workbook) stays rawdata with a data row
+    file_path = os.path.join(folder, "edge_legacy.xls")
+    with open(file_path, "wb") as f:
+        f.write(b"not a workbook")
+    assert pu.probe_file(file_path)["has_data_row"], ".xls dropped by probe_file"
+    print(f"Edge cases OK ({len(CSV_EDGE_CASES)} csv, 1 xls)")
+
+
+def timed(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return result, (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark legacy pandas file checks VS probe_file.")
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    folder = tempfile.mkdtemp(prefix="probe_bench_")
+    try:
+        check_edge_cases(folder)
+        for ext in ["xlsx", "csv"]:
+            for rows in args.rows:
+                file_path = build_file(folder, ext, rows)
+                size_mb = os.path.getsize(file_path) / 1024 / 1024
+
+                legacy, legacy_time = timed(lambda: (legacy_has_data_row(file_path), legacy_dataset_type(file_path)), args.repeat)
+                probe, probe_time = timed(lambda: pu.probe_file(file_path), args.repeat)
+
+                assert legacy == (probe["has_data_row"], probe["dataset_type"]), f"Mismatch: {legacy} VS {probe}"
+                print(
+                    f"{ext:4s} {rows:>8d} rows ({size_mb:6.1f} MB) | "
+                    f"legacy {legacy_time*1000:9.1f} ms | probe {probe_time*1000:9.1f} ms | x{legacy_time / probe_time:.1f}"
+                )
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
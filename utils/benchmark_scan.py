@@ -0,0 +1,114 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Benchmark of the rawdata snapshot scan (serial VS thread pool) on a synthetic tree:
+#   RAWDATA_ROOT/<projectid>_<name>/WE <yyyy.mm.dd>/<file>.csv
+# The pipeline modules load config and the project masterfile at import time, so the
+# synthetic environment must be in place before importing them.
+
+START_DATE = "2025-07-04"
+UQD_HEADER = ["actor_id", "quality_actor_id", "job_id", "review_ds", "queue_name", "decision_data", "quality_decision_data", "extracted_label"]
+
+
+def build_synthetic_tree(root, projects, weeks, files_per_week):
+    rawdata_root = os.path.join(root, "rawdata")
+    pipeline_root = os.path.join(root, "pipeline")
+    os.makedirs(os.path.join(pipeline_root, "Data_Process"), exist_ok=True)
+    os.makedirs(os.path.join(pipeline_root, "OLAP_Export"), exist_ok=True)
+
+    week_dates = pd.date_range(START_DATE, periods=weeks, freq="7D")
+    row = ",".join(["123456789012", "123456789013", "123456789014", "2025-07-01", "queue", "{}", "{}", "{}"])
+    content = ",".join(UQD_HEADER) + "\n" + row + "\n"
+
+    project_rows = []
+    for p in range(projects):
+        project_id = f"BENCH{p:05d}"
+        folder_name = f"{project_id}_Benchmark Project {p}"
+        for week in week_dates:
+            week_path = os.path.join(rawdata_root, folder_name, "WE " + week.strftime("%Y.%m.%d"))
+            os.makedirs(week_path, exist_ok=True)
+            for f in range(files_per_week):
+                with open(os.path.join(week_path, f"uqd_export_{f}.csv"), "w") as fh:
+                    fh.write(content)
+
+        project_rows.append({
+            "_project_id": project_id,
+            "_project_name": f"Benchmark Project {p}",
+            "_project_codename": f"bench{p}",
+            "_project_status": "Active",
+            "_project_is_active": True,
+            "_raw_folder_name": folder_name,
+            "_project_start_date": week_dates[0],
+            "_project_end_date": week_dates[-1],
+            "_project_target": "90%",
+            "_project_methodology": "audit",
+            "_project_metric": "accuracy",
+            "_project_data_type": "UQD",
+            "_project_base": "audit",
+            "_project_config": json.dumps({
+                "dataset_type": "UQD",
+                "module": "UQD",
+                "files_filter": {"begins_with": "uqd_export"},
+                "module_config": {}
+            }),
+        })
+
+    masterfile_path = os.path.join(pipeline_root, "OLAP_Export", "project_masterfile.xlsx")
+    pd.DataFrame(project_rows).to_excel(masterfile_path, sheet_name="Project List", index=False)
+
+    return rawdata_root, pipeline_root
+
+
+def run_scan(rf, project_df, last_snapshot, workers):
+    rf.probe_cache.clear()  # cold probe cache for a fair comparison
+    start = time.perf_counter()
+    df = rf.scan_rawdata(project_df, rf.RAW_DATA_ROOT, last_snapshot.copy(), create_missing=False, workers=workers)
+    return df, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark serial VS parallel rawdata scan.")
+    parser.add_argument('--projects', type=int, default=200)
+    parser.add_argument('--weeks', type=int, default=60)
+    parser.add_argument('--files', type=int, default=1, help='Files per week folder')
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--keep', action='store_true', help='Keep the synthetic tree')
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix="scan_bench_")
+    try:
+        print(f"Building synthetic tree: {args.projects} projects x {args.weeks} weeks x {args.files} files ({root})")
+        rawdata_root, pipeline_root = build_synthetic_tree(root, args.projects, args.weeks, args.files)
+        os.environ["RAWDATA_ROOT_PATH"] = rawdata_root
+        os.environ["PIPELINE_ROOT_PATH"] = pipeline_root
+
+        import pipeline_lib.rawdata_fetch as rf
+
+        project_df = rf.project_list_df
+        empty_snapshot = rf.snapshot_queue.get_snapshot(None)
+
+        serial_df, serial_time = run_scan(rf, project_df, empty_snapshot, workers=1)
+        parallel_df, parallel_time = run_scan(rf, project_df, empty_snapshot, workers=args.workers)
+
+        pd.testing.assert_frame_equal(serial_df, parallel_df)
+        identical = serial_df.to_csv(index=False) == parallel_df.to_csv(index=False)
+
+        print(f"Rows: {len(serial_df)}")
+        print(f"Serial scan:              {serial_time:8.2f}s")
+        print(f"Parallel scan ({args.workers:2d} workers): {parallel_time:8.2f}s  (x{serial_time / parallel_time:.2f})")
+        print(f"Byte-identical snapshot:  {identical}")
+    finally:
+        if not args.keep:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import os
+import sys
+import gc
+import time
+import argparse
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pipeline_lib.project_transformers.transformer_utils as tu
+
+# Memory benchmark (tracemalloc peak) of the wide -> long reshape done by UQD/CVS transformers:
+#   legacy: one copy of the base columns per label + pd.concat
+#   tiled:  tu.to_long (categorical ids, numpy tile/repeat)
+
+BASE_COLS = ["workflow", "job_date", "rater_id", "auditor_id", "job_id"]
+
+
+def legacy_to_long(result, base_cols, all_labels):
+    has_auditor = any(c.startswith("a_") for c in result.columns)
+    n = len(result)
+    base = result[base_cols].copy()
+
+    frames = []
+    for label in all_labels:
+        r_col = f"r_{label}"
+        r = result[r_col] if r_col in result.columns else pd.Series([""]*n, index=result.index)
+
+        df_lab = base.copy()
+        df_lab["parent_label"] = label
+        df_lab["rater_response"] = r.fillna("")
+
+        if has_auditor:
+            a_col = f"a_{label}"
+            a = result[a_col] if a_col in result.columns else pd.Series([""]*n, index=result.index)
+            df_lab["auditor_response"] = a.fillna("")
+
+        frames.append(df_lab)
+
+    return pd.concat(frames, ignore_index=True)
+
+
+def build_wide_result(rows, labels, seed=0):
+    rng = np.random.default_rng(seed)
+    raters = np.array([str(x) for x in rng.integers(10**11, 10**12, size=2_000)], dtype=object)
+    answers = np.array(["yes", "no", "n/a", None], dtype=object)
+
+    data = {
+        "workflow": np.array(["queue_a", "queue_b", "queue_c"], dtype=object)[rng.integers(0, 3, size=rows)],
+        "job_date": pd.Timestamp("2025-07-01") + pd.to_timedelta(rng.integers(0, 28, size=rows), unit="D"),
+        "rater_id": raters[rng.integers(0, len(raters), size=rows)],
+        "auditor_id": raters[rng.integers(0, len(raters), size=rows)],
+        "job_id": np.array([str(x) for x in np.arange(10**12, 10**12 + rows)], dtype=object),
+    }
+    for i in range(labels):
+        data[f"r_label_{i:02d}"] = answers[rng.integers(0, len(answers), size=rows)]
+        if i != labels - 1:  # auditor missing a label: filled with ""
+            data[f"a_label_{i:02d}"] = answers[rng.integers(0, len(answers), size=rows)]
+    return pd.DataFrame(data), [f"label_{i:02d}" for i in range(labels)]
+
+
+def measure(func):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    out = func()
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return out, elapsed, current, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory benchmark of legacy VS tiled to_long.")
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--labels', type=int, default=30)
+    parser.add_argument('--skip-legacy', action='store_true', help='Only measure tu.to_long')
+    args = parser.parse_args()
+
+    result, all_labels = build_wide_result(args.rows, args.labels)
+    print(f"Input: {args.rows} rows x {args.labels} labels -> {args.rows * args.labels} long rows")
+
+    tiled, tiled_time, tiled_size, tiled_peak = measure(lambda: tu.to_long(result, BASE_COLS, all_labels))
+    print(f"to_long:        peak {tiled_peak / 2**20:8.1f} MiB  output {tiled_size / 2**20:8.1f} MiB  {tiled_time:6.2f}s")
+
+    if args.skip_legacy:
+        return
+
+    tiled = tiled.astype({c: object for c in tu.LONG_CATEGORICAL_COLS})
+    legacy, legacy_time, legacy_size, legacy_peak = measure(lambda: legacy_to_long(result, BASE_COLS, all_labels))
+    print(f"legacy concat:  peak {legacy_peak / 2**20:8.1f} MiB  output {legacy_size / 2**20:8.1f} MiB  {legacy_time:6.2f}s")
+    print(f"Peak memory reduction: x{legacy_peak / tiled_peak:.1f}")
+
+    pd.testing.assert_frame_equal(legacy, tiled)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pipeline_lib.project_transformers.transformer_utils as tu
+from pipeline_lib.project_transformers.mod_uqd import uqd_extract_labels
+from pipeline_lib.project_transformers.mod_cvs import cvs_extract_labels
+
+# Golden-output check of the UQD/CVS label extraction on the decision_data shapes found in exports,
+# followed by a timing of row-wise stdlib extraction VS tu.extract_labels_batch (orjson if installed).
+
+
+# --- Payload shapes
+_NESTED_RESPONSE = json.dumps({"2049381": {"payload": [
+    {"values": {"is_violating": "Yes", "policy": ["Hate Speech", "Bullying"], "notes": " line1\nline2 ", "meta": {"k": " v "}}},
+    {"values": {"severity": 3, "missing": None}},
+    "skip-me"
+]}})
+
+UQD_PAYLOADS = [
+    json.dumps({"is_rejected": False, "response": _NESTED_RESPONSE}),
+    json.dumps({"is_rejected": False, "response": _NESTED_RESPONSE}).replace('"', "'"),  # python repr export
+    json.dumps({"is_rejected": True, "response": None}),
+    json.dumps({"is_rejected": False, "response": "null"}),
+    json.dumps({"is_rejected": False, "response": json.dumps({"1": {"payload": {"values": {"single": "obj"}}}})}),
+    json.dumps({"is_rejected": False, "response": json.dumps({"1": {"payload": [{"values": {"q": "it's"}}]}})}),
+    json.dumps({"decision_string": "abc", "labels": ["label_a::Yes", "label_b::No"]}),
+    json.dumps({"decision_string": "abc", "labels": "not-a-list"}),
+    json.dumps({"something_else": 1}),
+    json.dumps([1, 2, 3]),
+    "{not json",
+    "",
+    json.dumps({"is_rejected": False, "response": json.dumps({"1": {"payload": [{"values": {"nan_val": float("nan"), "big": 123456789012345678901234567890}}]}})}),
+]
+
+UQD_EXTRACTED_PAYLOADS = [
+    json.dumps({"q1": "yes", "q2": ["a", " b "], "q3": {"k": " v "}, "q4": None, "q5": 1.5}),
+    json.dumps(["not", "a", "dict"]),
+    "{broken",
+]
+
+CVS_PAYLOADS = [
+    json.dumps({"decision_string": "abc", "labels": ["label_a::Yes", "label_b::No"]}),
+    json.dumps({"1234567890123": json.dumps({"decision_string": "x", "labels": ["label_a::No"]})}),
+    json.dumps({"1234567890123": ""}),
+    json.dumps({"unknown": 1}),
+    "{broken",
+]
+
+# --- Expected output (recorded from the row-wise stdlib implementation)
+_NESTED_LABELS = ['is_violating::Yes', 'policy::Hate Speech,Bullying', 'notes::line1 line2', 'meta::{"k":"v"}', 'severity::3', 'missing::']
+
+UQD_GOLDEN = [
+    _NESTED_LABELS,
+    _NESTED_LABELS,
+    [],
+    [],
+    ['single::obj'],
+    [],
+    ['label_a::Yes', 'label_b::No'],
+    [],
+    [],
+    [],
+    [],
+    [],
+    ['nan_val::', 'big::123456789012345678901234567890'],
+]
+
+UQD_EXTRACTED_GOLDEN = [
+    ['q1::yes', 'q2::a,b', 'q3::{"k":"v"}', 'q4::', 'q5::1.5'],
+    [],
+    [],
+]
+
+CVS_GOLDEN = [
+    ['label_a::Yes', 'label_b::No'],
+    ('1234567890123', ['label_a::No']),
+    None,
+    None,
+    None,
+]
+
+
+def check_golden():
+    checks = [
+        ("UQD", UQD_PAYLOADS, UQD_GOLDEN, uqd_extract_labels, (False,)),
+        ("UQD extracted", UQD_EXTRACTED_PAYLOADS, UQD_EXTRACTED_GOLDEN, uqd_extract_labels, (True,)),
+        ("CVS", CVS_PAYLOADS, CVS_GOLDEN, cvs_extract_labels, ()),
+    ]
+    for name, payloads, golden, func, args in checks:
+        # Each payload twice: cached rows must match too
+        batch = tu.extract_labels_batch(payloads + payloads, func, *args)
+        assert batch == golden + golden, f"{name}: batch extraction differs from golden output"
+
+        row_wise = [func(p, *args) for p in payloads]
+        assert row_wise == golden, f"{name}: row-wise extraction differs from golden output"
+
+        print(f"{name:14s} golden output OK ({len(payloads)} payload shapes)")
+
+
+def build_uqd_column(rows, distinct, seed=0):
+    rng = random.Random(seed)
+    labels = ["is_violating", "policy", "severity", "notes", "language", "region"]
+    payloads = []
+    for i in range(distinct):
+        values = {label: rng.choice(["Yes", "No", ["A", "B"], i % 7]) for label in labels}
+        response = json.dumps({str(1000 + i): {"payload": [{"values": values}]}})
+        payloads.append(json.dumps({"is_rejected": False, "response": response}))
+    return [payloads[rng.randrange(distinct)] for _ in range(rows)]
+
+
+def benchmark(rows, distinct):
+    column = build_uqd_column(rows, distinct)
+
+    fast_json = tu.orjson
+    tu.orjson = None
+    try:
+        start = time.perf_counter()
+        row_wise = [uqd_extract_labels(x, False) for x in column]
+        row_wise_time = time.perf_counter() - start
+    finally:
+        tu.orjson = fast_json
+
+    start = time.perf_counter()
+    batch = tu.extract_labels_batch(column, uqd_extract_labels, False)
+    batch_time = time.perf_counter() - start
+
+    assert batch == row_wise, "Batch extraction differs from row-wise extraction"
+    print(f"Rows: {rows} ({distinct} distinct decision_data), orjson: {'yes' if tu.orjson is not None else 'no'}")
+    print(f"Row-wise (stdlib json): {row_wise_time:8.2f}s")
+    print(f"extract_labels_batch:   {batch_time:8.2f}s  (x{row_wise_time / batch_time:.1f})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Golden-output check and benchmark of UQD/CVS label extraction.")
+    parser.add_argument('--rows', type=int, default=500000)
+    parser.add_argument('--distinct', type=int, default=5000, help='Distinct decision_data strings')
+    parser.add_argument('--skip-benchmark', action='store_true')
+    args = parser.parse_args()
+
+    check_golden()
+    if not args.skip_benchmark:
+        benchmark(args.rows, args.distinct)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import os
+import sys
+import shutil
+import tempfile
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Check of the OLAP sync lease handling on a scratch pipeline root: a group whose reports fail
+# (False or an exception) is not retried by the same run, and its items can be claimed again
+# with pop_group as soon as the run ends, instead of after QUEUE_LEASE_SECONDS.
+
+ROOT = tempfile.mkdtemp(prefix="check_queue_leases_")
+os.environ["PIPELINE_ROOT_PATH"] = ROOT
+os.environ["RAWDATA_ROOT_PATH"] = os.path.join(ROOT, "rawdata")
+os.environ["OLAP_INCREMENTAL"] = "false"
+
+FAILING_PROJECT = "CHECK00000"
+PASSING_PROJECT = "CHECK00001"
+DATA_WEEK = "2025-07-04"
+
+
+def write_masterfile():
+    rows = []
+    for project_id in (FAILING_PROJECT, PASSING_PROJECT):
+        rows.append({
+            "_project_id": project_id, "_project_name": project_id, "_project_status": "Active",
+            "_project_target": "90%", "_project_base": "audit", "_project_data_type": "UQD"
+        })
+    os.makedirs(os.path.join(ROOT, "OLAP_Export"), exist_ok=True)
+    pd.DataFrame(rows).to_excel(os.path.join(ROOT, "OLAP_Export", "project_masterfile.xlsx"), sheet_name="Project List", index=False)
+
+
+def enqueue_ready(queue):
+    # Two files per project-week, both transformed and waiting for OLAP sync
+    items = [
+        {"project_id": project_id, "project_name": project_id, "data_week": DATA_WEEK, "filename": f"file{f}.csv"}
+        for project_id in (FAILING_PROJECT, PASSING_PROJECT) for f in range(2)
+    ]
+    queue.push_many(items)
+    while (item := queue.pop()) is not None:
+        queue.complete_transform(item["item_id"], "transformed")
+
+
+def check(label, osy, run, failure):
+    queue = osy.transformation_queue
+    enqueue_ready(queue)
+    calls = []
+
+    def fake_reports(project_id, project_base, reporting_week, target, engine=None, manifest=None):
+        calls.append(project_id)
+        if project_id != FAILING_PROJECT:
+            return True
+        if failure == "raise":
+            raise RuntimeError("report failure")
+        return False
+
+    osy.generate_olap_reports = fake_reports
+    try:
+        run(queue.count(status="olap_sync_ready"))
+    except RuntimeError:
+        pass
+
+    group = queue.pop_group(mode="olap_sync_ready")
+    ok = [item["project_id"] for item in group] == [FAILING_PROJECT] * 2 and calls.count(FAILING_PROJECT) == 1
+    print(f"{label:<28} failing group attempts={calls.count(FAILING_PROJECT)}  reclaimed={len(group)}  {'OK' if ok else 'FAILED'}")
+
+    # Clean state for the next check
+    queue.mark_olap_synced_many([item["item_id"] for item in group])
+    while (rest := queue.pop_group(mode="olap_sync_ready")):
+        queue.mark_olap_synced_many([item["item_id"] for item in rest])
+    return ok
+
+
+def check_owner(osy):
+    # Only the lease owner gives a lease back
+    from pipeline_lib.queues import TransformationQueueManager
+    queue = osy.transformation_queue
+    enqueue_ready(queue)
+    group = queue.pop_group(mode="olap_sync_ready")
+    item_ids = [item["item_id"] for item in group]
+
+    other = TransformationQueueManager(queue.filepath, lease_seconds=queue.lease_seconds)
+    foreign = other.release_leases(item_ids)
+    blocked = not any(item["item_id"] in item_ids for item in other.pop_group(mode="olap_sync_ready"))
+    own = queue.release_leases(item_ids)
+
+    ok = foreign == [] and blocked and own == item_ids
+    print(f"{'release by another owner':<28} foreign={len(foreign)}  own={len(own)}  {'OK' if ok else 'FAILED'}")
+    return ok
+
+
+def main():
+    write_masterfile()
+    import pipeline_lib.olap_sync as osy
+
+    results = [
+        check("serial, reports failed", osy, osy.olap_sync_serial, "false"),
+        check("serial, reports raised", osy, osy.olap_sync_serial, "raise"),
+        check("parallel, reports failed", osy, lambda total: osy.olap_sync_parallel(total, 2), "false"),
+        check("parallel, reports raised", osy, lambda total: osy.olap_sync_parallel(total, 2), "raise"),
+        check_owner(osy),
+    ]
+    shutil.rmtree(ROOT, ignore_errors=True)
+    if not all(results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()